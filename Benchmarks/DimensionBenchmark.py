@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Common.GenerationLog import MemoryLog
+from Common.Seeding import SeedScript
+from Common.Sweep import LoadScript
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+#High-dimensional DeJong benchmark
+#Times the array-backed GA and ES for a growing number of genes N and records generations per second
+ENGINES = {
+    "DeJong2GAArray": os.path.join(ROOT, "Homework03", "DeJong2GA", "DeJong2GAArray.py"),
+    "DeJong2ESArray": os.path.join(ROOT, "Homework03", "DeJong2ES", "DeJong2ESArray.py"),
+}
+
+GENE_COUNTS = [4, 10, 100, 1000, 10000]
+
+#Runs one engine for the given number of genes and generations
+def BenchmarkEngine(scriptPath, genes, generations, seed):
+    module = LoadScript(scriptPath)
+    module.N = genes
+    module.NUMBER_OF_GENERATIONS = generations + 1
+    SeedScript(module, seed)
+
+    log = MemoryLog()
+    start = time.perf_counter()
+    module.Run(log)
+    elapsed = time.perf_counter() - start
+
+    #The run can stop early on its fitness threshold, so only generations that actually ran count
+    ran = int(log.Records()["generation"][-1])
+
+    return {
+        "genes": genes,
+        "generations": ran,
+        "seconds": elapsed,
+        "generations_per_second": ran / elapsed,
+        "evals": int(module.cumulative_evals),
+        "bytes_per_genome": module.BytesPerGenome(),
+    }
+
+#python Benchmarks/DimensionBenchmark.py --generations 200 --out dimensions.json
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generations per second of the array engines as N grows")
+    parser.add_argument("--generations", type=int, default=200)
+    parser.add_argument("--genes", type=int, nargs="*", default=GENE_COUNTS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="dimension_benchmark.json")
+    args = parser.parse_args()
+
+    results = {}
+    for name, scriptPath in ENGINES.items():
+        results[name] = []
+
+        for genes in args.genes:
+            result = BenchmarkEngine(scriptPath, genes, args.generations, args.seed)
+            results[name].append(result)
+
+            print("{} N {} {:.1f} generations/sec {} bytes/genome".format(
+                name,
+                genes,
+                result["generations_per_second"],
+                result["bytes_per_genome"]))
+
+    with open(args.out, "w") as out:
+        json.dump(results, out, indent=4)
@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Common.GenerationLog import TextLog
+from Common.Instrumentation import PhaseTimer, TimedWriter
+from Common.Seeding import SeedScript
+from Common.Sweep import LoadScript
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+BASELINE_STRING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "throughput_baseline.json")
+
+#Throughput benchmark for every optimizer script
+#Each script is run for a fixed seed and number of generations with its operators timed by phase.
+#Results can be saved as a baseline, and later runs are flagged when they are slower than it by more than a threshold.
+
+#Script path and whether it is a FinalProject script
+#Every script lists the functions timed under each phase in its own PHASES
+SCRIPTS = {
+    "DeJong2GA": (os.path.join(ROOT, "Homework03", "DeJong2GA", "DeJong2GA.py"), False),
+    "DeJong2ES": (os.path.join(ROOT, "Homework03", "DeJong2ES", "DeJong2ES.py"), False),
+    "HimmelblauES": (os.path.join(ROOT, "Homework02", "HimmelblauES", "Himmelblau.py"), False),
+    "FinalProjectFirst": (os.path.join(ROOT, "FinalProject", "First", "FinalProjectFirstIteration.py"), True),
+    "FinalProjectAC": (os.path.join(ROOT, "FinalProject", "AC", "FinalProjectWithAC.py"), True),
+    "FinalProjectMagic": (os.path.join(ROOT, "FinalProject", "Magic", "FinalProjectWithMagic.py"), True),
+    "FinalProjectPointRemoval": (os.path.join(ROOT, "FinalProject", "Point Removal", "FinalProjectWithPointRemoval.py"), True),
+}
+
+#Point buy handed to the FinalProject scripts in place of the interactive prompt
+POINTS = 10
+
+def BenchmarkScript(name, generations, seed, directory):
+    scriptPath, isFinalProject = SCRIPTS[name]
+
+    module = LoadScript(scriptPath, "benchmark_" + name)
+    module.NUMBER_OF_GENERATIONS = generations + 1
+    SeedScript(module, seed)
+
+    timer = PhaseTimer()
+    timer.Instrument(module, module.PHASES)
+
+    #Every script counts its evaluations in cumulative_evals, cached ones included, while its timed objective only
+    #runs on the FinalProject fitness cache's misses
+    evals = module.cumulative_evals
+    start = time.perf_counter()
+    if isFinalProject:
+        with open(os.path.join(directory, name + ".txt"), "w") as out:
+            with open(os.path.join(directory, name + "_population.txt"), "w") as lastPop:
+                module.Run(POINTS, TimedWriter(out, timer), TimedWriter(lastPop, timer))
+    else:
+        with TextLog(os.path.join(directory, name + ".txt"), module.LogLabel()) as log:
+            log.Record = timer.Wrap("io", log.Record)
+            module.Run(log)
+    elapsed = time.perf_counter() - start
+    evals = module.cumulative_evals - evals
+
+    phaseSeconds = dict(timer.seconds)
+    phaseSeconds["other"] = elapsed - timer.TotalSeconds()
+
+    return {
+        "generations": generations,
+        "seconds": elapsed,
+        "generations_per_second": generations / elapsed,
+        "evals_per_second": evals / elapsed,
+        "phase_seconds": phaseSeconds,
+    }
+
+#Names of the scripts whose generations per second dropped more than threshold below the baseline
+def FindRegressions(results, baseline, threshold):
+    regressions = []
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        if result["generations_per_second"] < baseline[name]["generations_per_second"] * (1 - threshold):
+            regressions.append(name)
+
+    return regressions
+
+#python Benchmarks/ThroughputBenchmark.py --generations 200 [--save-baseline]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of every optimizer script")
+    parser.add_argument("--generations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scripts", nargs="*", default=list(SCRIPTS))
+    parser.add_argument("--baseline", default=BASELINE_STRING)
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown against the baseline")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.scripts:
+            results[name] = BenchmarkScript(name, args.generations, args.seed, directory)
+
+            print("{} {:.1f} generations/sec {:.1f} evals/sec | {}".format(
+                name,
+                results[name]["generations_per_second"],
+                results[name]["evals_per_second"],
+                " ".join("{} {:.3f}s".format(phase, seconds) for phase, seconds in results[name]["phase_seconds"].items())))
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as out:
+            json.dump(results, out, indent=4)
+        print("Baseline saved to " + args.baseline)
+
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as baselineFile:
+            regressions = FindRegressions(results, json.load(baselineFile), args.threshold)
+
+        for name in regressions:
+            print("REGRESSION: {} is more than {:.0%} slower than its baseline".format(name, args.threshold))
+
+        if regressions:
+            sys.exit(1)
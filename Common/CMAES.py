@@ -0,0 +1,108 @@
+import math
+
+import numpy as np
+
+#Covariance matrix adaptation evolution strategy
+#Minimizes a cost over real vectors. Every generation Ask samples lambda points from N(mean, sigma^2 C)
+#as one matrix, and Tell moves the mean to the weighted average of the best mu points, updates C with the
+#rank-one (evolution path) and rank-mu (selected steps) updates and adapts sigma by cumulative step-size control.
+#Default parameters follow Hansen's "The CMA Evolution Strategy: A Tutorial".
+
+#Population size used when none is given, for n dimensions
+def DefaultLambda(n):
+    return 4 + int(3 * math.log(n))
+
+class CMAES:
+    def __init__(self,
+                 mean,
+                 sigma,
+                 lambdaSize=None,
+                 muSize=None):
+        self.mean = np.array(mean, dtype=np.float64)
+        self.sigma = float(sigma)
+
+        n = len(self.mean)
+        self.n = n
+
+        self.lambdaSize = lambdaSize or DefaultLambda(n)
+        self.muSize = muSize or self.lambdaSize // 2
+
+        #Positive recombination weights, larger for better ranked points
+        weights = math.log((self.lambdaSize + 1) / 2.0) - np.log(np.arange(1, self.muSize + 1))
+        self.weights = weights / weights.sum()
+        self.muEff = 1.0 / np.sum(self.weights ** 2)
+
+        #Learning rates for the step-size path, the covariance path and the two covariance updates
+        self.cSigma = (self.muEff + 2) / (n + self.muEff + 5)
+        self.dSigma = 1 + 2 * max(0.0, math.sqrt((self.muEff - 1) / (n + 1)) - 1) + self.cSigma
+        self.cC = (4 + self.muEff / n) / (n + 4 + 2 * self.muEff / n)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.muEff)
+        self.cMu = min(1 - self.c1, 2 * (self.muEff - 2 + 1 / self.muEff) / ((n + 2) ** 2 + self.muEff))
+
+        #Expected length of a standard normal vector
+        self.chiN = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+        self.pSigma = np.zeros(n)
+        self.pC = np.zeros(n)
+        self.C = np.eye(n)
+        self.B = np.eye(n)
+        self.D = np.ones(n)
+        self.invSqrtC = np.eye(n)
+
+        self.generation = 0
+
+        #C is only decomposed again every lambda / ((c1 + cMu) n 10) generations, which keeps the O(n^3) cost below the
+        #O(lambda n^2) updates
+        self.eigenInterval = max(1, int(self.lambdaSize / ((self.c1 + self.cMu) * n * 10)))
+        self.eigenGeneration = 0
+
+    #lambda new points as a (lambda, n) matrix, one per row
+    def Ask(self, rng):
+        z = rng.standard_normal((self.lambdaSize, self.n))
+        return self.mean + self.sigma * ((z * self.D) @ self.B.T)
+
+    #cost holds one value per row of samples, lower is better
+    def Tell(self, samples, cost):
+        n = self.n
+        self.generation += 1
+
+        best = np.argsort(cost, kind="stable")[:self.muSize]
+        steps = (np.asarray(samples)[best] - self.mean) / self.sigma
+
+        oldMean = self.mean
+        meanStep = self.weights @ steps
+        self.mean = oldMean + self.sigma * meanStep
+
+        #Step-size path, measured in the coordinates where C is the identity
+        self.pSigma = (1 - self.cSigma) * self.pSigma + math.sqrt(self.cSigma * (2 - self.cSigma) * self.muEff) * (self.invSqrtC @ meanStep)
+        pSigmaNorm = np.linalg.norm(self.pSigma)
+
+        #The covariance path stalls while the step-size path is unusually long, so C does not grow too fast after sigma shrinks
+        hSigma = pSigmaNorm / math.sqrt(1 - (1 - self.cSigma) ** (2 * self.generation)) < (1.4 + 2 / (n + 1)) * self.chiN
+        self.pC = (1 - self.cC) * self.pC + hSigma * math.sqrt(self.cC * (2 - self.cC) * self.muEff) * meanStep
+
+        rankOne = np.outer(self.pC, self.pC)
+        rankMu = (steps.T * self.weights) @ steps
+        self.C = ((1 - self.c1 - self.cMu) * self.C
+                  + self.c1 * (rankOne + (1 - hSigma) * self.cC * (2 - self.cC) * self.C)
+                  + self.cMu * rankMu)
+
+        self.sigma *= math.exp((self.cSigma / self.dSigma) * (pSigmaNorm / self.chiN - 1))
+
+        if self.generation - self.eigenGeneration >= self.eigenInterval:
+            self.Decompose()
+
+    def Decompose(self):
+        self.eigenGeneration = self.generation
+
+        #Keep C exactly symmetric and positive definite after rounding
+        self.C = np.triu(self.C) + np.triu(self.C, 1).T
+        eigenvalues, self.B = np.linalg.eigh(self.C)
+        eigenvalues = np.maximum(eigenvalues, eigenvalues.max() * 1e-20)
+
+        self.D = np.sqrt(eigenvalues)
+        self.invSqrtC = (self.B / self.D) @ self.B.T
+
+    #Standard deviation of the search distribution along every coordinate
+    def StepSizes(self):
+        return self.sigma * np.sqrt(np.diag(self.C))
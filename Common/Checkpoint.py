@@ -0,0 +1,100 @@
+import glob
+import json
+import os
+import random
+import tempfile
+
+import numpy as np
+
+#Checkpoints for long runs
+#A snapshot is one compressed .npz holding the arrays a driver hands over (population, fitness, counters),
+#the generation it was taken after, the state of both the random module and the driver's numpy generator
+#(with the numbers its RandomStream has drawn but not handed out), and how far the generation log had
+#been written, so a resumed run continues exactly where the snapshot was taken.
+#
+#Snapshots are written to a temporary file and moved into place with os.replace, so a crash while saving
+#never leaves a half written snapshot behind. Only the newest keep snapshots are kept.
+class Checkpointer:
+    def __init__(self,
+                 directory,
+                 name,
+                 interval,
+                 keep=3):
+        self.directory = directory
+        self.name = name
+        self.interval = interval
+        self.keep = keep
+
+    def Due(self, generation):
+        return self.interval > 0 and generation % self.interval == 0
+
+    #Snapshot files from oldest to newest, the zero padded generation keeps them in order
+    def Paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, self.name + "_*.npz")))
+
+    def Save(self, generation, arrays, rng, log=None, stream=None):
+        os.makedirs(self.directory, exist_ok=True)
+
+        snapshot = dict(arrays)
+        snapshot["generation"] = generation
+        snapshot.update(RandomState(rng, stream))
+
+        #Everything recorded so far has to be on disk before its offset is saved
+        if log is not None:
+            snapshot["log_offset"] = log.Tell()
+
+        fileString = os.path.join(self.directory, "{}_{:012d}.npz".format(self.name, generation))
+
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as temp:
+            np.savez_compressed(temp, **snapshot)
+            temp.flush()
+            os.fsync(temp.fileno())
+
+        os.replace(temp.name, fileString)
+
+        for old in self.Paths()[:-self.keep]:
+            os.remove(old)
+
+        return fileString
+
+    #Returns the newest snapshot as a dictionary of arrays, or None when there is none
+    def Latest(self):
+        paths = self.Paths()
+        if not paths:
+            return None
+
+        return LoadCheckpoint(paths[-1])
+
+def LoadCheckpoint(fileString):
+    with np.load(fileString) as data:
+        return {name: data[name] for name in data.files}
+
+#State of the random module and of a numpy generator as snapshot arrays
+#random.getstate() is (version, 625 words of Mersenne Twister state, the cached gauss value or None)
+def RandomState(rng, stream=None):
+    version, words, gauss = random.getstate()
+
+    state = {
+        "python_random_version": version,
+        "python_random": np.array(words, dtype=np.uint32),
+        "python_random_gauss": np.nan if gauss is None else gauss,
+        "numpy_random": json.dumps(rng.bit_generator.state),
+    }
+
+    if stream is not None:
+        state.update(stream.State())
+
+    return state
+
+#Puts both generators, and the stream drawing from rng, back exactly as they were when the snapshot was taken
+def RestoreRandomState(snapshot, rng, stream=None):
+    gauss = float(snapshot["python_random_gauss"])
+
+    random.setstate((int(snapshot["python_random_version"]),
+                     tuple(snapshot["python_random"].tolist()),
+                     None if np.isnan(gauss) else gauss))
+
+    rng.bit_generator.state = json.loads(str(snapshot["numpy_random"]))
+
+    if stream is not None:
+        stream.Restore(snapshot)
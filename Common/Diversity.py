@@ -0,0 +1,74 @@
+import math
+
+import numpy as np
+
+#Diameter of a population of 2-D points, the largest distance between any two of them
+#Small populations get it from one matrix of pairwise distances. Larger ones get it from the convex hull with
+#rotating calipers, which is O(n log n).
+
+#Up to this many points the full distance matrix is cheaper than building a hull
+SMALL_POPULATION = 256
+
+#Returns the diameter of points, an (n, 2) array
+def PopulationDiameter(points):
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+
+    if n < 2:
+        return 0.0
+
+    if n <= SMALL_POPULATION:
+        difference = points[:, None, :] - points[None, :, :]
+        return float(np.hypot(difference[..., 0], difference[..., 1]).max())
+
+    return HullDiameter(ConvexHull(points))
+
+#Twice the signed area of the triangle o, a, b, positive when a to b turns counter-clockwise around o
+def Cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+#Vertices of the convex hull in counter-clockwise order, by Andrew's monotone chain
+#Points on a hull edge are left out
+def ConvexHull(points):
+    ordered = np.unique(np.asarray(points, dtype=np.float64), axis=0).tolist()
+
+    if len(ordered) < 3:
+        return ordered
+
+    lower = []
+    for point in ordered:
+        while len(lower) >= 2 and Cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+
+    upper = []
+    for point in reversed(ordered):
+        while len(upper) >= 2 and Cross(upper[-2], upper[-1], point) <= 0:
+            upper.pop()
+        upper.append(point)
+
+    return lower[:-1] + upper[:-1]
+
+#Largest distance between two hull vertices by rotating calipers
+#For every edge the vertex furthest from it is found by walking forward, and that vertex only ever moves forward,
+#so the whole hull is covered in one turn
+def HullDiameter(hull):
+    m = len(hull)
+
+    if m < 2:
+        return 0.0
+    if m == 2:
+        return math.dist(hull[0], hull[1])
+
+    diameter = 0.0
+    j = 1
+
+    for i in range(m):
+        following = hull[(i + 1) % m]
+
+        while Cross(hull[i], following, hull[(j + 1) % m]) > Cross(hull[i], following, hull[j]):
+            j = (j + 1) % m
+
+        diameter = max(diameter, math.dist(hull[i], hull[j]), math.dist(following, hull[j]))
+
+    return diameter
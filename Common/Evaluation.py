@@ -0,0 +1,174 @@
+import copy
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+#Fitness evaluation backends
+#Evaluate(function, genomes) returns function(genome) for every genome, in the order of genomes.
+#The pool backends split the genomes into chunks sized from the measured cost of one evaluation,
+#so cheap fitness functions are not drowned in dispatch overhead and expensive ones keep every worker busy.
+#Fitness functions only read the genome, so the results are the same whichever backend runs them.
+
+#Seconds of work each chunk should hold
+TARGET_CHUNK_SECONDS = 0.02
+
+#A batch cheaper than this is evaluated in this process, a pool would only add overhead
+MIN_PARALLEL_SECONDS = 0.005
+
+#Weight of the newest batch in the running per evaluation cost
+COST_SMOOTHING = 0.5
+
+class SerialEvaluator:
+    def Evaluate(self, function, genomes):
+        return [function(genome) for genome in genomes]
+
+    def Close(self):
+        pass
+
+#Runs in a worker, returns the chunk's fitness values and how long they took
+#Process workers evaluate copies of the genomes, so they also send back every attribute the
+#fitness function may have set (like dpr and ac in FinalProjectWithAC.py)
+def EvaluateChunk(function, genomes, returnAttributes):
+    start = time.perf_counter()
+    fitness = [function(genome) for genome in genomes]
+    seconds = time.perf_counter() - start
+
+    return fitness, [vars(genome) for genome in genomes] if returnAttributes else None, seconds
+
+class PoolEvaluator:
+    def __init__(self,
+                 workers=None,
+                 chunkSize=None):
+        self.workers = workers or os.cpu_count()
+
+        #A fixed chunk size turns off the automatic sizing
+        self.chunkSize = chunkSize
+        self.secondsPerEvaluation = None
+
+        self.pool = None
+
+    def ChunkSize(self, count):
+        if self.chunkSize is not None:
+            return self.chunkSize
+
+        size = max(1, int(TARGET_CHUNK_SECONDS / max(self.secondsPerEvaluation, 1e-9)))
+
+        #Never fewer chunks than workers while there is enough work to go round
+        return min(size, max(1, math.ceil(count / self.workers)))
+
+    def MeasureCost(self, seconds, count):
+        cost = seconds / count
+
+        if self.secondsPerEvaluation is None:
+            self.secondsPerEvaluation = cost
+        else:
+            self.secondsPerEvaluation = COST_SMOOTHING * cost + (1 - COST_SMOOTHING) * self.secondsPerEvaluation
+
+    def Evaluate(self, function, genomes):
+        if not genomes:
+            return []
+
+        fitness = []
+        remaining = genomes
+
+        #The first genome is timed in this process to get a first estimate of the cost
+        if self.secondsPerEvaluation is None:
+            start = time.perf_counter()
+            fitness.append(function(genomes[0]))
+            self.MeasureCost(time.perf_counter() - start, 1)
+            remaining = genomes[1:]
+
+        if len(remaining) * self.secondsPerEvaluation < MIN_PARALLEL_SECONDS:
+            start = time.perf_counter()
+            fitness += [function(genome) for genome in remaining]
+            self.MeasureCost(time.perf_counter() - start, max(1, len(remaining)))
+            return fitness
+
+        pool = self.Pool(function)
+
+        size = self.ChunkSize(len(remaining))
+        chunks = [remaining[i:i + size] for i in range(0, len(remaining), size)]
+        futures = [pool.submit(EvaluateChunk, function, chunk, self.returnAttributes) for chunk in chunks]
+
+        seconds = 0.0
+        for chunk, future in zip(chunks, futures):
+            chunkFitness, attributes, chunkSeconds = future.result()
+            fitness += chunkFitness
+            seconds += chunkSeconds
+
+            if attributes is not None:
+                for genome, values in zip(chunk, attributes):
+                    genome.__dict__.update(values)
+
+        self.MeasureCost(seconds, len(remaining))
+
+        return fitness
+
+    def Pool(self, function):
+        if self.pool is None:
+            self.pool = self.CreatePool()
+
+        return self.pool
+
+    def Close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+#Threads share the genomes, which suits fitness functions that release the GIL (numpy, simulations in C)
+class ThreadPoolEvaluator(PoolEvaluator):
+    returnAttributes = False
+
+    def CreatePool(self):
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+#Processes side-step the GIL for pure Python fitness functions
+#The fitness function and genomes are pickled, so they have to be importable module level objects
+#Workers are forked with a copy of the script's module as it is when the pool starts, so the pool is
+#started again whenever the fitness function comes from a different module object (a new script, or the
+#same script loaded again by a sweep with other constants), or when the constants the module's objective tables are
+#compiled for have changed, so the workers never look fitness up in stale tables
+class ProcessPoolEvaluator(PoolEvaluator):
+    returnAttributes = True
+
+    def CreatePool(self):
+        return ProcessPoolExecutor(max_workers=self.workers)
+
+    def Pool(self, function):
+        module = sys.modules.get(function.__module__)
+        constants = ObjectiveConstants(module)
+
+        if self.pool is not None and (module is not self.module or constants != self.constants):
+            self.Close()
+
+        self.module = module
+        self.constants = constants
+        return PoolEvaluator.Pool(self, function)
+
+#Copy of the values returned by the module's ObjectiveConstants, the FinalProject scripts compile their objective
+#tables for them (see Common/ObjectiveTables.py), or None for a module without one
+def ObjectiveConstants(module):
+    constants = getattr(module, "ObjectiveConstants", None)
+
+    return copy.deepcopy(constants()) if constants is not None else None
+
+#One evaluator per backend and worker count, shared by every script in the process
+EVALUATORS = {}
+
+#name is "serial", "thread" or "process"
+def GetEvaluator(name, workers=None):
+    key = (name, workers)
+
+    if key not in EVALUATORS:
+        if name == "serial":
+            EVALUATORS[key] = SerialEvaluator()
+        elif name == "thread":
+            EVALUATORS[key] = ThreadPoolEvaluator(workers)
+        elif name == "process":
+            EVALUATORS[key] = ProcessPoolEvaluator(workers)
+        else:
+            raise ValueError("Unknown evaluator: " + str(name))
+
+    return EVALUATORS[key]
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+
+#Bounded fitness cache for scripts whose populations keep re-evaluating the same genomes
+#Genomes are keyed on the tuple of their representation, and the cache keeps the fitness along with every attribute
+#the fitness function sets (like dpr and ac in FinalProjectWithAC.py). When it holds capacity entries the least
+#recently used one is dropped. A batch only sends the representations the cache has not seen to the evaluator
+#backend, each of them once however many genomes in the batch share it.
+#
+#Hits and misses are counted, and Emit reports them once per output line.
+class FitnessCache:
+    def __init__(self,
+                 capacity,
+                 outputs=()):
+        self.capacity = capacity
+        self.outputs = outputs
+
+        #Representation tuple -> (fitness, output values), least recently used first
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def Enabled(self):
+        return self.capacity > 0
+
+    #Sets the outputs of genome from a cached entry and returns its fitness
+    def Restore(self, genome, entry):
+        fitness, values = entry
+        for name, value in zip(self.outputs, values):
+            setattr(genome, name, value)
+
+        return fitness
+
+    def Store(self, key, genome, fitness):
+        self.entries[key] = (fitness, tuple(getattr(genome, name) for name in self.outputs))
+
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    #Returns function(genome) for every genome, like an evaluator backend, evaluating the misses through evaluator
+    def Evaluate(self, evaluator, function, genomes):
+        if not self.Enabled():
+            return evaluator.Evaluate(function, genomes)
+
+        fitness = [None] * len(genomes)
+
+        #Representation tuple -> positions of the genomes in the batch that still need it
+        missing = {}
+
+        for i, genome in enumerate(genomes):
+            key = tuple(genome.representation)
+            entry = self.entries.get(key)
+
+            #A representation already missing from this batch is only evaluated once, so later copies count as hits
+            if entry is None:
+                if key in missing:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+
+                missing.setdefault(key, []).append(i)
+            else:
+                self.entries.move_to_end(key)
+                fitness[i] = self.Restore(genome, entry)
+                self.hits += 1
+
+        if missing:
+            first = [genomes[positions[0]] for positions in missing.values()]
+            values = evaluator.Evaluate(function, first)
+
+            for (key, positions), genome, value in zip(missing.items(), first, values):
+                self.Store(key, genome, value)
+
+                for i in positions:
+                    fitness[i] = value
+                    if i != positions[0]:
+                        self.Restore(genomes[i], self.entries[key])
+
+        return fitness
+
+    #Hits, misses and hit rate since the last call, e.g. "cache hits 95 misses 5 hit_rate 0.9500"
+    def Emit(self):
+        total = self.hits + self.misses
+        text = "cache hits {} misses {} hit_rate {:.4f}".format(self.hits, self.misses, self.hits / total if total else 0.0)
+
+        self.hits = 0
+        self.misses = 0
+
+        return text
@@ -0,0 +1,278 @@
+import json
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from Common.Seeding import SeedLine
+
+#Per generation statistics written by the DeJong and Himmelblau drivers
+GENERATION_DTYPE = np.dtype([("generation", "<i8"),
+                             ("evals", "<i8"),
+                             ("champion", "<f8"),
+                             ("average", "<f8"),
+                             ("diversity", "<f8")])
+
+#One generation of a run, as yielded by a driver's Evolve generator
+#genome is the champion's representation as a tuple, so a record never changes after it has been handed out
+GenerationStats = namedtuple("GenerationStats", ["generation", "evals", "champion", "average", "diversity", "genome"])
+
+MAGIC = b"EVOLOG1\n"
+
+#Header is padded so the records that follow it start on an aligned offset
+HEADER_ALIGNMENT = 64
+
+#In memory generation log
+#Stats go into preallocated typed columns that double in size whenever they fill up.
+#Only every stride-th generation is kept, unless force asks for it, and Record returns whether it was.
+class MemoryLog:
+    def __init__(self,
+                 stride=1,
+                 capacity=1024):
+        self.stride = stride
+        self.count = 0
+
+        self.generation = np.empty(capacity, dtype=np.int64)
+        self.evals = np.empty(capacity, dtype=np.int64)
+        self.champion = np.empty(capacity, dtype=np.float64)
+        self.average = np.empty(capacity, dtype=np.float64)
+        self.diversity = np.zeros(capacity, dtype=np.float64)
+
+    def Record(self, generation, evals, champion, average, diversity=0.0, force=False):
+        if generation % self.stride != 0 and not force:
+            return False
+
+        if self.count == len(self.generation):
+            self.Grow()
+
+        i = self.count
+        self.generation[i] = generation
+        self.evals[i] = evals
+        self.champion[i] = champion
+        self.average[i] = average
+        self.diversity[i] = diversity
+        self.count += 1
+
+        return True
+
+    def Grow(self):
+        capacity = 2 * len(self.generation)
+
+        for name in GENERATION_DTYPE.names:
+            column = np.zeros(capacity, dtype=GENERATION_DTYPE[name])
+            column[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, column)
+
+    #Returns the kept generations packed as GENERATION_DTYPE records
+    def Records(self):
+        records = np.empty(self.count, dtype=GENERATION_DTYPE)
+        for name in GENERATION_DTYPE.names:
+            records[name] = getattr(self, name)[:self.count]
+
+        return records
+
+    def Clear(self):
+        self.count = 0
+
+    def Flush(self):
+        pass
+
+    def Close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.Close()
+
+#Binary generation log
+#Stats are buffered in a MemoryLog and written out in bulk whenever the buffer fills.
+#The file is a small JSON header followed by packed GENERATION_DTYPE records, so it can be opened
+#with ReadGenerationLog as a memory map without parsing anything.
+#Given an offset from Tell, an existing log is cut back to that point and appended to.
+class GenerationLog:
+    def __init__(self,
+                 fileString,
+                 label,
+                 hasDiversity=False,
+                 stride=1,
+                 bufferSize=65536,
+                 offset=None,
+                 seed=None):
+        self.label = label
+        self.hasDiversity = hasDiversity
+        self.bufferSize = bufferSize
+        self.buffer = MemoryLog(stride, bufferSize)
+
+        if offset is None:
+            self.file = open(fileString, "wb")
+            header = {"label": label, "hasDiversity": hasDiversity, "stride": stride}
+            if seed is not None:
+                header["seed"] = seed
+
+            WriteHeader(self.file, header)
+        else:
+            self.file = open(fileString, "r+b")
+            self.file.seek(offset)
+            self.file.truncate()
+
+    def Record(self, generation, evals, champion, average, diversity=0.0, force=False):
+        kept = self.buffer.Record(generation, evals, champion, average, diversity, force)
+
+        if self.buffer.count == self.bufferSize:
+            self.Flush()
+
+        return kept
+
+    def Flush(self):
+        if self.buffer.count == 0:
+            return
+
+        self.buffer.Records().tofile(self.file)
+        self.buffer.Clear()
+
+    #Flushes and returns the size of everything recorded so far
+    def Tell(self):
+        self.Flush()
+        self.file.flush()
+        return self.file.tell()
+
+    def Close(self):
+        self.Flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.Close()
+
+#Text generation log
+#Writes the same lines the drivers have always written, one per kept generation
+#A run's seed record, when given, goes on a "# seed" line before the first generation
+#Given an offset from Tell, an existing log is cut back to that point and appended to.
+class TextLog:
+    def __init__(self,
+                 fileString,
+                 label,
+                 hasDiversity=False,
+                 stride=1,
+                 offset=None,
+                 seed=None):
+        self.label = label
+        self.hasDiversity = hasDiversity
+        self.stride = stride
+
+        if offset is None:
+            self.file = open(fileString, "w")
+
+            if seed is not None:
+                self.file.write(SeedLine(seed))
+        else:
+            self.file = open(fileString, "r+")
+            self.file.seek(offset)
+            self.file.truncate()
+
+    def Record(self, generation, evals, champion, average, diversity=0.0, force=False):
+        if generation % self.stride != 0 and not force:
+            return False
+
+        self.file.write(FormatLine(self.label, self.hasDiversity, generation, evals, champion, average, diversity))
+        return True
+
+    def Flush(self):
+        self.file.flush()
+
+    #Flushes and returns the size of everything recorded so far
+    def Tell(self):
+        self.file.flush()
+        return self.file.tell()
+
+    def Close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.Close()
+
+#Records every generation a driver's Evolve generator yields to log
+#The last generation is always recorded, even when it falls between two strides, so a log never loses the final
+#champion and evaluation count of a run
+#Returns what the generator returns when it finishes, the driver's final population
+def RecordGenerations(log, generations):
+    stats = None
+    kept = True
+
+    while True:
+        try:
+            stats = next(generations)
+        except StopIteration as stop:
+            if not kept:
+                log.Record(stats.generation, stats.evals, stats.champion, stats.average, stats.diversity, force=True)
+
+            return stop.value
+
+        kept = log.Record(stats.generation, stats.evals, stats.champion, stats.average, stats.diversity)
+
+#Opens the log sink a driver asked for
+#Binary logs take the text file name with a .bin extension
+#offset resumes an existing log from a checkpoint instead of starting a new one
+#seed is the run's seed record from Common.Seeding.SeedRecord, kept in the log's header
+def OpenLog(fileString, label, binary=False, stride=1, hasDiversity=False, offset=None, seed=None):
+    if binary:
+        return GenerationLog(os.path.splitext(fileString)[0] + ".bin", label, hasDiversity, stride, offset=offset, seed=seed)
+
+    return TextLog(fileString, label, hasDiversity, stride, offset, seed)
+
+def FormatLine(label, hasDiversity, generation, evals, champion, average, diversity):
+    if hasDiversity:
+        return "{} Generation {} {} {} {} {}\n".format(label, generation, evals, champion, average, diversity)
+
+    return "{} Generation {} {} {} {}\n".format(label, generation, evals, champion, average)
+
+def WriteHeader(file, header):
+    encoded = json.dumps(header).encode("utf-8")
+    length = len(MAGIC) + 4 + len(encoded)
+    padding = (-length) % HEADER_ALIGNMENT
+
+    file.write(MAGIC)
+    file.write((len(encoded) + padding).to_bytes(4, "little"))
+    file.write(encoded + b" " * padding)
+
+#Returns the header and a read-only memory map of the records in a binary generation log
+def ReadGenerationLog(fileString):
+    with open(fileString, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(fileString + " is not a binary generation log")
+
+        headerLength = int.from_bytes(file.read(4), "little")
+        header = json.loads(file.read(headerLength).decode("utf-8"))
+
+    offset = len(MAGIC) + 4 + headerLength
+    if os.path.getsize(fileString) == offset:
+        return header, np.empty(0, dtype=GENERATION_DTYPE)
+
+    return header, np.memmap(fileString, dtype=GENERATION_DTYPE, mode="r", offset=offset)
+
+#Reproduces the text log a driver would have written from a binary generation log
+def ConvertToText(binaryFileString, out):
+    header, records = ReadGenerationLog(binaryFileString)
+
+    if "seed" in header:
+        out.write(SeedLine(header["seed"]))
+
+    #tolist hands back Python ints and floats so they print exactly like the drivers print them
+    for record in records.tolist():
+        out.write(FormatLine(header["label"], header["hasDiversity"], *record))
+
+#python -m Common.GenerationLog OutputMR08-10.bin [OutputMR08-10.txt]
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "w") as out:
+            ConvertToText(sys.argv[1], out)
+    else:
+        ConvertToText(sys.argv[1], sys.stdout)
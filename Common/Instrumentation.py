@@ -0,0 +1,164 @@
+import functools
+import time
+
+#Phase timing for the driver scripts
+#Functions are swapped out in a script's module namespace for wrappers that time every call.
+#Time is exclusive: when a timed function calls another timed function, the inner call's time
+#only counts towards the inner function's phase.
+#Nothing is wrapped until Instrument is called, so an uninstrumented run pays nothing.
+class PhaseTimer:
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+
+        #Time spent in timed callees, one entry per timed call currently running
+        self.childSeconds = []
+
+    def Wrap(self, phase, function):
+        self.seconds.setdefault(phase, 0.0)
+        self.calls.setdefault(phase, 0)
+
+        @functools.wraps(function)
+        def Timed(*args, **kwargs):
+            self.childSeconds.append(0.0)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.seconds[phase] += elapsed - self.childSeconds.pop()
+                self.calls[phase] += 1
+
+                if self.childSeconds:
+                    self.childSeconds[-1] += elapsed
+
+        Timed.wrapped = function
+        return Timed
+
+    #phases maps a phase name to the names of the module's functions that belong to it
+    def Instrument(self, module, phases):
+        for phase, names in phases.items():
+            for name in names:
+                setattr(module, name, self.Wrap(phase, getattr(module, name)))
+
+    def Reset(self):
+        for phase in self.seconds:
+            self.seconds[phase] = 0.0
+            self.calls[phase] = 0
+
+    def TotalSeconds(self):
+        return sum(self.seconds.values())
+
+#Puts back every function Instrument swapped out
+def Uninstrument(module, phases):
+    for names in phases.values():
+        for name in names:
+            function = getattr(module, name)
+            setattr(module, name, getattr(function, "wrapped", function))
+
+#File-like object that times its writes under the "io" phase
+class TimedWriter:
+    def __init__(self,
+                 file,
+                 timer):
+        self.file = file
+        self.write = timer.Wrap("io", file.write)
+
+#Counts calls of a script's functions, swapped in the same way as PhaseTimer
+#counters maps a counter name to the names of the module's functions that add to it,
+#e.g. {"evals": ["DeJongFitness"], "mutation_attempts": ["MutationAttempt"]}
+class CallCounter:
+    def __init__(self):
+        self.counts = {}
+
+    def Wrap(self, name, function):
+        self.counts.setdefault(name, 0)
+
+        @functools.wraps(function)
+        def Counted(*args, **kwargs):
+            self.counts[name] += 1
+            return function(*args, **kwargs)
+
+        Counted.wrapped = function
+        return Counted
+
+    def Instrument(self, module, counters):
+        for name, functions in counters.items():
+            for function in functions:
+                setattr(module, function, self.Wrap(name, getattr(module, function)))
+
+    def Reset(self):
+        for name in self.counts:
+            self.counts[name] = 0
+
+#Call counts and phase times of a script, reported as text once per output line
+#Enable wraps the functions and Disable puts them back, so a disabled monitor costs nothing.
+class GenerationMonitor:
+    def __init__(self,
+                 module,
+                 phases,
+                 counters):
+        self.module = module
+        self.phases = phases
+        self.counters = counters
+        self.enabled = False
+
+        self.timer = PhaseTimer()
+        self.counter = CallCounter()
+
+    def Enable(self):
+        if self.enabled:
+            return
+
+        self.timer.Instrument(self.module, self.phases)
+        self.counter.Instrument(self.module, self.counters)
+        self.enabled = True
+
+    def Disable(self):
+        if not self.enabled:
+            return
+
+        #Counters were wrapped around the timers, so they come off first
+        Uninstrument(self.module, self.counters)
+        Uninstrument(self.module, self.phases)
+        self.enabled = False
+
+    #Counts and phase seconds since the last call, e.g. "evals 100 mutation_attempts 9 | selection 0.000412s variation 0.000108s"
+    def Emit(self):
+        counts = " ".join("{} {}".format(name, count) for name, count in self.counter.counts.items())
+        seconds = " ".join("{} {:.6f}s".format(phase, seconds) for phase, seconds in self.timer.seconds.items())
+
+        self.counter.Reset()
+        self.timer.Reset()
+
+        return counts + " | " + seconds
+
+#File-like object that appends the monitor's counts and times to the end of every write
+#Each write is one output line (or one two-line FinalProject record), so the numbers cover every
+#generation since the previous line.
+class MonitoredWriter:
+    def __init__(self,
+                 file,
+                 monitor):
+        self.file = file
+        self.monitor = monitor
+
+    def write(self, text):
+        return self.file.write(text[:-1] + " | " + self.monitor.Emit() + "\n")
+
+    def flush(self):
+        self.file.flush()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+#Turns on a script's monitor and routes its numbers into the text output
+#The script's PHASES and COUNTERS name what is timed and counted.
+def MonitorScript(module, file):
+    monitor = GenerationMonitor(module, module.PHASES, module.COUNTERS)
+    monitor.Enable()
+
+    return MonitoredWriter(file, monitor)
@@ -0,0 +1,183 @@
+import argparse
+import json
+import multiprocessing
+import os
+
+import numpy as np
+
+from Common.GenerationLog import MemoryLog
+from Common.Seeding import RootSequence, SeedRecord, SeedScript, SeedTree, SpawnSequences
+from Common.Sweep import LoadScript
+
+#Island model
+#K copies of a driver script evolve side by side, one per process. Every MIGRATION_INTERVAL generations
+#each island sends copies of its best genomes to its neighbours, which replace their worst genomes with them.
+#Migrants travel as a representation matrix and a fitness vector, never as pickled Genome objects.
+#
+#A driver needs InitializePopulation, MakeNewGeneration, AddPopulationStats, a Genome(representation, fitness)
+#class, a population with members and average_fitness, and a FITNESS_THRESHOLD, like DeJong2GA.py and DeJong2ES.py.
+#Both of those maximize fitness.
+#
+#Every island is seeded with its own child spawned from one root seed, so islands never share random numbers.
+
+#Returns the islands each island sends its migrants to
+def Neighbours(index, islands, topology):
+    if topology == "ring":
+        return [(index + 1) % islands] if islands > 1 else []
+    elif topology == "full":
+        return [other for other in range(islands) if other != index]
+
+    raise ValueError("Unknown island topology: " + str(topology))
+
+#Copies of the best count genomes as a representation matrix and a fitness vector
+def PackMigrants(population, count):
+    best = sorted(population.members, key=lambda g: g.fitness, reverse=True)[:count]
+
+    representations = np.array([genome.representation for genome in best], dtype=np.float64)
+    fitness = np.array([genome.fitness for genome in best], dtype=np.float64)
+
+    return representations, fitness
+
+#Replaces the worst members of the population with the incoming migrants
+def AcceptMigrants(module, population, representations, fitness):
+    population.members.sort(key=lambda g: g.fitness)
+
+    for i in range(min(len(fitness), len(population.members))):
+        migrant = module.Genome(representations[i].tolist(), float(fitness[i]))
+
+        #Migrants arrive already evaluated
+        migrant.changed = False
+        population.members[i] = migrant
+
+    return module.AddPopulationStats(population)
+
+class IslandResult:
+    def __init__(self,
+                 index,
+                 records,
+                 bestRepresentation,
+                 bestFitness,
+                 evals,
+                 seed):
+        self.index = index
+        self.records = records
+        self.bestRepresentation = bestRepresentation
+        self.bestFitness = bestFitness
+        self.evals = evals
+
+        #Seed record of the island's child in the seed tree
+        self.seed = seed
+
+#Runs in its own process
+def RunIsland(index, scriptPath, settings, seed, inboxes, neighbours, barrier, stopFlag, results):
+    module = LoadScript(scriptPath, "island{}_{}".format(index, os.path.splitext(os.path.basename(scriptPath))[0]))
+    SeedScript(module, seed)
+
+    interval = settings["interval"]
+    migrants = settings["migrants"]
+    log = MemoryLog()
+
+    module.cumulative_evals = 0
+    population = module.InitializePopulation()
+    log.Record(0, module.cumulative_evals, population.champion_fitness, population.average_fitness)
+
+    generation = 0
+    while True:
+        #A block never runs past the last generation, and an island that reaches the threshold goes straight to the
+        #barrier, where every island stops
+        reached = False
+        for i in range(min(interval, settings["generations"] - generation)):
+            generation += 1
+            population = module.MakeNewGeneration(population)
+            log.Record(generation, module.cumulative_evals, population.champion_fitness, population.average_fitness)
+
+            if population.average_fitness > module.FITNESS_THRESHOLD:
+                reached = True
+                break
+
+        if reached or generation >= settings["generations"]:
+            stopFlag.value = 1
+
+        #Send first, the inbox queues never block so every island reaches the barrier
+        representations, fitness = PackMigrants(population, migrants)
+        for neighbour in neighbours:
+            inboxes[neighbour].put((representations, fitness))
+
+        #Every island reads the same stop decision: nobody can set the flag again until all have passed the second barrier
+        barrier.wait()
+        stop = stopFlag.value == 1
+        barrier.wait()
+
+        #Migrants from the last exchange are still drained so nothing is left behind in the queues
+        for i in range(settings["incoming"][index]):
+            representations, fitness = inboxes[index].get()
+            population = AcceptMigrants(module, population, representations, fitness)
+
+        if stop:
+            break
+
+    best = max(population.members, key=lambda g: g.fitness)
+    results.put(IslandResult(index, log.Records(), np.array(best.representation), best.fitness, module.cumulative_evals, SeedRecord(seed)))
+
+#Runs the island model and returns the seed tree and one IslandResult per island, ordered by island index
+#A seed of None draws fresh entropy, which is kept in the seed tree
+def RunIslands(scriptPath, islands, interval, migrants, topology="ring", generations=None, seed=0):
+    scriptPath = os.path.abspath(scriptPath)
+
+    if generations is None:
+        generations = LoadScript(scriptPath).NUMBER_OF_GENERATIONS
+
+    neighbours = [Neighbours(index, islands, topology) for index in range(islands)]
+    incoming = [sum(index in targets for targets in neighbours) for index in range(islands)]
+
+    settings = {"interval": interval, "migrants": migrants, "generations": generations, "incoming": incoming}
+
+    inboxes = [multiprocessing.Queue() for i in range(islands)]
+    barrier = multiprocessing.Barrier(islands)
+    stopFlag = multiprocessing.Value("i", 0)
+    results = multiprocessing.Queue()
+
+    root = RootSequence(seed)
+    sequences = SpawnSequences(root, islands)
+
+    processes = []
+    for index in range(islands):
+        process = multiprocessing.Process(target=RunIsland,
+                                          args=(index, scriptPath, settings, sequences[index], inboxes, neighbours[index], barrier, stopFlag, results))
+        process.start()
+        processes.append(process)
+
+    #Results have to be read before joining, a process does not exit while its queue still holds data
+    islandResults = sorted((results.get() for i in range(islands)), key=lambda result: result.index)
+
+    for process in processes:
+        process.join()
+
+    return SeedTree(root, sequences), islandResults
+
+#python -m Common.Islands Homework03/DeJong2ES/DeJong2ES.py --islands 8 --interval 25 --migrants 2 --topology ring
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a driver script as an island model")
+    parser.add_argument("script")
+    parser.add_argument("--islands", type=int, default=os.cpu_count())
+    parser.add_argument("--interval", type=int, default=25, help="generations between migrations")
+    parser.add_argument("--migrants", type=int, default=2, help="genomes sent to each neighbour")
+    parser.add_argument("--topology", choices=["ring", "full"], default="ring")
+    parser.add_argument("--generations", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    seedTree, islandResults = RunIslands(args.script, args.islands, args.interval, args.migrants, args.topology, args.generations, args.seed)
+
+    print("# seed " + json.dumps(seedTree))
+
+    for result in islandResults:
+        print("Island {} Generation {} {} {} {}".format(
+            result.index,
+            result.records["generation"][-1],
+            result.evals,
+            result.bestFitness,
+            result.records["average"][-1]))
+
+    best = max(islandResults, key=lambda result: result.bestFitness)
+    print("Best {} from island {}: {}".format(best.bestFitness, best.index, best.bestRepresentation.tolist()))
@@ -0,0 +1,246 @@
+import json
+import os
+import re
+import sys
+import tempfile
+
+import numpy as np
+
+from Common.GenerationLog import GENERATION_DTYPE, MAGIC, ReadGenerationLog
+
+#Loader for the run logs every script in the repository writes
+#A text log is streamed line by line into a typed record array, one field per column, and the result is cached
+#next to the log as a .npy sidecar with a small .json stamp. Loading the log again while its size and modification
+#time still match the stamp memory maps the sidecar instead of parsing anything, so it takes the same time however
+#long the log is. Binary generation logs are already memory mapped and are never cached.
+#
+#Formats:
+#"generation"  the DeJong and Himmelblau drivers, "<label> Generation <generation> <evals> <champion> <average> [<diversity>]"
+#              ("# seed" lines and the " | ..." numbers INSTRUMENT adds are skipped)
+#"binary"      the same records in a binary generation log from Common/GenerationLog.py
+#"sga"         the simple GAs in C from Homework01 and Homework02, a "<name> <population> <bits> <mutation> <crossover>"
+#              line, then "<generation> <champion> <average> <identical>% Identical" lines (Homework01) or the
+#              header repeated before "<generation> <unused> <champion> <average> <diversity>" (HimmelblauGA)
+#"character"   the FinalProject scripts, a "Generation <generation> | Average Fitness: <average>" line followed by a
+#              "Champion: <class>, CHA <n>, ... STR <n> - FITNESS <champion>" line for every record
+
+SGA_DTYPE = np.dtype([("generation", "<i8"),
+                      ("champion", "<f8"),
+                      ("average", "<f8"),
+                      ("identical", "<f8"),
+                      ("diversity", "<f8")])
+
+CHARACTER_DTYPE = np.dtype([("generation", "<i8"),
+                            ("average", "<f8"),
+                            ("champion", "<f8"),
+                            ("class", "<U10"),
+                            ("cha", "<i8"),
+                            ("wis", "<i8"),
+                            ("int", "<i8"),
+                            ("con", "<i8"),
+                            ("dex", "<i8"),
+                            ("str", "<i8")])
+
+CHARACTER_TITLE = "DND 5e Character Generator"
+
+SGA_HEADER = re.compile(r"^(.*?) (\d+) (\d+) ([\d.]+) ([\d.]+)$")
+CHARACTER_GENERATION = re.compile(r"Generation (\d+) \| Average Fitness: (\S+)")
+CHARACTER_CHAMPION = re.compile(r"Champion: (\w+), CHA (-?\d+), WIS (-?\d+), INT (-?\d+), CON (-?\d+), DEX (-?\d+), STR (-?\d+) [|-] FITNESS (\S+)")
+
+class LoadedLog:
+    def __init__(self,
+                 fileString,
+                 format,
+                 info,
+                 records):
+        self.fileString = fileString
+        self.format = format
+
+        #What the log says about its run besides the records: its label, header values or seed record
+        self.info = info
+
+        #One record per logged generation, every column is records[name]
+        self.records = records
+
+#Structured array that doubles in size whenever it fills up, filled one record at a time
+class RecordBuffer:
+    def __init__(self,
+                 dtype,
+                 capacity=1024):
+        self.records = np.empty(capacity, dtype=dtype)
+        self.count = 0
+
+    def Append(self, record):
+        if self.count == len(self.records):
+            grown = np.empty(2 * len(self.records), dtype=self.records.dtype)
+            grown[:self.count] = self.records
+            self.records = grown
+
+        self.records[self.count] = record
+        self.count += 1
+
+    def Records(self):
+        return self.records[:self.count].copy()
+
+#Returns the format name of a text log from its first line
+def DetectFormat(firstLine):
+    if firstLine.startswith(CHARACTER_TITLE):
+        return "character"
+    elif " Generation " in firstLine:
+        return "generation"
+    elif SGA_HEADER.match(firstLine):
+        return "sga"
+
+    raise ValueError("Unknown log format: " + firstLine)
+
+def ParseGenerationLines(lines, info):
+    buffer = RecordBuffer(GENERATION_DTYPE)
+
+    for line in lines:
+        if line.startswith("# seed "):
+            info["seed"] = json.loads(line[len("# seed "):])
+            continue
+
+        label, separator, fields = line.partition(" Generation ")
+        if not separator:
+            continue
+
+        info["label"] = label
+
+        #Numbers INSTRUMENT adds follow a " | "
+        fields = fields.split(" | ", 1)[0].split()
+        info["hasDiversity"] = len(fields) > 4
+
+        buffer.Append((int(fields[0]), int(fields[1]), float(fields[2]), float(fields[3]), float(fields[4]) if len(fields) > 4 else 0.0))
+
+    return buffer.Records()
+
+def ParseSGALines(lines, info):
+    buffer = RecordBuffer(SGA_DTYPE)
+    header = None
+
+    for line in lines:
+        line = line.rstrip("\n")
+
+        if header is None:
+            match = SGA_HEADER.match(line)
+            header = line
+            info.update(name=match.group(1), population=int(match.group(2)), bits=int(match.group(3)),
+                        mutation=float(match.group(4)), crossover=float(match.group(5)))
+        elif line.startswith("ALGORITHM TERMINATED"):
+            info["terminated"] = line
+        elif line.startswith(header + " "):
+            #HimmelblauGA prints its fitness values through mismatched format codes, the second number is not a value
+            fields = line[len(header) + 1:].split()
+            buffer.Append((int(fields[0]), float(fields[2]), float(fields[3]), np.nan, float(fields[4])))
+        elif line:
+            fields = line.split()
+            buffer.Append((int(fields[0]), float(fields[1]), float(fields[2]), float(fields[3].rstrip("%")), np.nan))
+
+    return buffer.Records()
+
+def ParseCharacterLines(lines, info):
+    buffer = RecordBuffer(CHARACTER_DTYPE)
+    generation = None
+
+    for line in lines:
+        if line.startswith("# seed "):
+            info["seed"] = json.loads(line[len("# seed "):])
+            continue
+
+        if line.startswith(CHARACTER_TITLE):
+            #"DND 5e Character Generator | ES | Mu: 20 | Lambda: 100 |  Generation 0 | ..."
+            parts = line.split(" | ")
+            info["title"] = " | ".join(parts[:2])
+            info["mu"] = int(parts[2].split(": ")[1])
+            info["lambda"] = int(parts[3].split(": ")[1])
+
+        match = CHARACTER_GENERATION.search(line)
+        if match:
+            generation = (int(match.group(1)), float(match.group(2)))
+            continue
+
+        match = CHARACTER_CHAMPION.search(line)
+        if match and generation is not None:
+            buffer.Append(generation + (float(match.group(8)), match.group(1)) + tuple(int(match.group(i)) for i in range(2, 8)))
+            generation = None
+
+    return buffer.Records()
+
+PARSERS = {
+    "generation": ParseGenerationLines,
+    "sga": ParseSGALines,
+    "character": ParseCharacterLines,
+}
+
+#Streams a text log into a LoadedLog without touching any cache
+def ParseLog(fileString):
+    info = {}
+
+    with open(fileString, "r") as file:
+        firstLine = file.readline()
+        while firstLine.startswith("# seed "):
+            info["seed"] = json.loads(firstLine[len("# seed "):])
+            firstLine = file.readline()
+
+        format = DetectFormat(firstLine.rstrip("\n"))
+        file.seek(0)
+
+        records = PARSERS[format](file, info)
+
+    return LoadedLog(fileString, format, info, records)
+
+def CachePaths(fileString):
+    return fileString + ".npy", fileString + ".json"
+
+#Size and modification time of the log, a cached parse is only used while both still match
+def SourceStamp(fileString):
+    status = os.stat(fileString)
+    return {"size": status.st_size, "mtime_ns": status.st_mtime_ns}
+
+def IsBinaryLog(fileString):
+    with open(fileString, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+#Returns the LoadedLog of any log, from its sidecar cache when that is still current
+def LoadLog(fileString, cache=True):
+    if IsBinaryLog(fileString):
+        header, records = ReadGenerationLog(fileString)
+        return LoadedLog(fileString, "binary", header, records)
+
+    recordsString, stampString = CachePaths(fileString)
+    stamp = SourceStamp(fileString)
+
+    if cache and os.path.exists(recordsString) and os.path.exists(stampString):
+        with open(stampString, "r") as file:
+            cached = json.load(file)
+
+        if cached["source"] == stamp:
+            return LoadedLog(fileString, cached["format"], cached["info"], np.load(recordsString, mmap_mode="r"))
+
+    log = ParseLog(fileString)
+
+    if cache:
+        SaveCache(log, stamp)
+
+    return log
+
+#Writes the sidecar through temporary files moved into place, records first so a stamp never points at missing records
+def SaveCache(log, stamp):
+    recordsString, stampString = CachePaths(log.fileString)
+    directory = os.path.dirname(os.path.abspath(log.fileString))
+
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as temp:
+        np.save(temp, log.records)
+    os.replace(temp.name, recordsString)
+
+    with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as temp:
+        json.dump({"source": stamp, "format": log.format, "info": log.info}, temp)
+    os.replace(temp.name, stampString)
+
+#python -m Common.LogLoader Homework02/HimmelblauES/Output.txt FinalProject/AC/outputAC.txt
+if __name__ == "__main__":
+    for fileString in sys.argv[1:]:
+        log = LoadLog(fileString)
+        last = log.records[-1].tolist() if len(log.records) else None
+        print("{}: {} log, {} records, last {}".format(fileString, log.format, len(log.records), last))
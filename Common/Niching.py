@@ -0,0 +1,113 @@
+import math
+
+import numpy as np
+
+from Common.SpatialGrid import SpatialGrid
+
+#Niching for multimodal problems
+#Both methods turn the costs of a pool of genomes (lower is better) into niched costs that selection uses in their
+#place, so genomes crowding into one basin stop pushing out the genomes in every other basin.
+#
+#"clearing"  from the best genome down, a genome keeps its cost unless capacity better genomes that kept theirs
+#            are within radius, otherwise it is cleared to infinity
+#"sharing"   every genome's cost is raised by its niche count m = sum over neighbours closer than radius of
+#            1 - (d / radius)^alpha, counting itself. The shared fitness 1 / (1 + cost) is divided by m,
+#            which makes the niched cost (1 + cost) * m - 1
+#
+#Clearing is the default. It only checks a genome against the winners in the cells around it, and there are never more
+#than a few winners per cell, so after sorting the costs it is linear in the pool size however crowded the pool is.
+#It is also the method that keeps all four Himmelblau minima populated.
+#
+#Sharing sums exact distances to the neighbours in the 3x3 block of radius sized cells a SpatialGrid finds around
+#every genome. That skips the far away genomes, but inside a crowded basin every genome is a neighbour of every other
+#one, so there it costs as much as comparing all pairs and only suits small pools. The pairs are gathered a batch of
+#genomes at a time, so such a pool never holds all its pairs in memory at once. The "binned" sharing mode bins every
+#genome into cells SHARING_BINS to a radius and sums every cell's niche count from the counts of the cells around it,
+#which grows with the occupied cells and not with the pairs. Its counts are approximate (off by a few tens of
+#percent), so it is only used when asked for.
+
+#Candidate pairs gathered at once while counting niches
+SHARING_BATCH = 1 << 22
+
+#Cells per radius when niche counts are binned
+SHARING_BINS = 4
+
+#mode is "exact" or "binned", and only matters for sharing
+def NichedCosts(method, points, cost, radius, alpha=1.0, capacity=1, mode="exact"):
+    cost = np.asarray(cost, dtype=np.float64)
+
+    if method == "sharing":
+        return SharedCosts(points, cost, radius, alpha, mode)
+    elif method == "clearing":
+        return ClearedCosts(points, cost, radius, capacity)
+
+    raise ValueError("Unknown niching method: " + str(method))
+
+def SharedCosts(points, cost, radius, alpha=1.0, mode="exact"):
+    if mode == "exact":
+        nicheCount = NicheCounts(points, radius, alpha)
+    elif mode == "binned":
+        nicheCount = BinnedNicheCounts(points, radius, alpha)
+    else:
+        raise ValueError("Unknown sharing mode: " + str(mode))
+
+    return (1.0 + cost) * nicheCount - 1.0
+
+#Niche count of every genome, counting itself
+def NicheCounts(points, radius, alpha=1.0):
+    grid = SpatialGrid(points, radius)
+    nicheCount = np.ones(len(grid.points))
+
+    for batch in grid.Batches(SHARING_BATCH):
+        owners, others, distances = grid.NeighbourPairs(radius, batch)
+        nicheCount += np.bincount(owners, weights=1.0 - (distances / radius) ** alpha, minlength=len(nicheCount))
+
+    return nicheCount
+
+#Niche counts with every genome moved to the corner of its cell, so distances are whole numbers of cells
+def BinnedNicheCounts(points, radius, alpha=1.0):
+    grid = SpatialGrid(points, radius / SHARING_BINS, SHARING_BINS)
+    occupied, inverse, counts = np.unique(grid.keys, return_inverse=True, return_counts=True)
+
+    niche = np.zeros(len(occupied))
+
+    for dx in range(-SHARING_BINS, SHARING_BINS + 1):
+        for dy in range(-SHARING_BINS, SHARING_BINS + 1):
+            distance = math.hypot(dx, dy) * grid.cellSize
+            if distance >= radius:
+                continue
+
+            #Occupied cells at this offset from every occupied cell
+            target = occupied + dx * grid.columns + dy
+            index = np.minimum(np.searchsorted(occupied, target), len(occupied) - 1)
+            hit = occupied[index] == target
+
+            niche[hit] += (1.0 - (distance / radius) ** alpha) * counts[index[hit]]
+
+    return niche[inverse]
+
+def ClearedCosts(points, cost, radius, capacity=1):
+    points = np.asarray(points, dtype=np.float64)
+    cells = np.floor(points / radius).astype(np.int64).tolist()
+    coordinates = points.tolist()
+
+    #Cell -> positions of the genomes in it that kept their cost
+    winners = {}
+    cleared = np.ones(len(cost), dtype=bool)
+
+    for i in np.argsort(cost, kind="stable").tolist():
+        x, y = coordinates[i]
+        column, row = cells[i]
+        better = 0
+
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for winnerX, winnerY in winners.get((column + dx, row + dy), ()):
+                    if math.hypot(winnerX - x, winnerY - y) <= radius:
+                        better += 1
+
+        if better < capacity:
+            cleared[i] = False
+            winners.setdefault((column, row), []).append((x, y))
+
+    return np.where(cleared, np.inf, cost)
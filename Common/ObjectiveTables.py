@@ -0,0 +1,91 @@
+import copy
+
+import numpy as np
+
+#Objective compiler for the FinalProject character scripts
+#A character's fitness only depends on its class and the modifiers of its six ability scores, and scores 6 to 18 only
+#give the seven modifiers -2 to 4. So the script's objective is run once per class on a grid of every modifier
+#combination, each score axis holding one score per modifier, and its results are kept as a table per class indexed
+#by the six modifiers. Evaluating a genome is then one table lookup.
+#
+#The objective has to work on numpy arrays as well as on numbers (floor division instead of math.floor, np.minimum
+#instead of min and so on). Broadcasting leaves out the scores a class never reads, so a class's table only spans the
+#scores it depends on, at most a few thousand entries, and is kept as a flat list of plain Python numbers.
+#
+#Refresh compiles the tables again whenever the values returned by the script's constants function have changed.
+#A script calls it once before every batch of lookups, so Lookup itself is only the index arithmetic. A genome looked
+#up before the first Refresh is handed to the objective.
+
+LOWEST_SCORE = 6
+HIGHEST_SCORE = 18
+
+#One score per modifier, 6 gives -2, 8 gives -1, ... 18 gives 4
+MODIFIER_SCORES = np.arange(LOWEST_SCORE, HIGHEST_SCORE + 1, 2)
+
+#Stand-in genome the objective is run on while compiling, each of its scores is MODIFIER_SCORES along its own axis
+class TableGenome:
+    def __init__(self,
+                 representation):
+        self.representation = representation
+
+class ObjectiveTables:
+    def __init__(self,
+                 objective,
+                 classes,
+                 constants,
+                 outputs=()):
+        #objective(genome) returns the fitness and may set the attributes named in outputs on the genome
+        self.objective = objective
+        self.classes = classes
+        self.constants = constants
+        self.outputs = outputs
+
+        #Class -> (fitness table, one table per output)
+        self.tables = {}
+        self.stamp = None
+
+    def Compile(self):
+        self.tables = {}
+
+        axes = [MODIFIER_SCORES.reshape([-1 if axis == i else 1 for axis in range(6)]) for i in range(6)]
+
+        for charClass in self.classes:
+            genome = TableGenome([charClass] + axes)
+            results = [np.asarray(self.objective(genome))] + [np.asarray(getattr(genome, name)) for name in self.outputs]
+
+            #Only the axes some result varies along are kept
+            shape = np.broadcast_shapes(*(result.shape for result in results))
+            tables = [np.broadcast_to(result, shape).ravel().tolist() for result in results]
+
+            #Score -> its modifier's offset into the flat tables, for each of the six scores
+            strides = [int(np.prod(shape[axis + 1:])) if shape[axis] > 1 else 0 for axis in range(len(shape))] + [0] * (6 - len(shape))
+            offsets = [{int(score): i * stride for i, score in enumerate(MODIFIER_SCORES)} for stride in strides]
+
+            #Odd scores share the offset of the even score below them
+            for table in offsets:
+                table.update({score + 1: table[score] for score in list(table) if score < HIGHEST_SCORE})
+
+            self.tables[charClass] = (offsets, tables)
+
+        self.stamp = copy.deepcopy(self.constants())
+
+    def Refresh(self):
+        if self.constants() != self.stamp:
+            self.Compile()
+
+    #Returns the genome's fitness and sets its outputs, from the tables or, for a class or score they do not
+    #cover, from the objective itself
+    def Lookup(self, genome):
+        rep = genome.representation
+
+        try:
+            offsets, tables = self.tables[rep[0]]
+            index = offsets[0][rep[1]] + offsets[1][rep[2]] + offsets[2][rep[3]] + offsets[3][rep[4]] + offsets[4][rep[5]] + offsets[5][rep[6]]
+        except KeyError:
+            return self.objective(genome)
+
+        if self.outputs:
+            for name, table in zip(self.outputs, tables[1:]):
+                setattr(genome, name, table[index])
+
+        return tables[0][index]
@@ -0,0 +1,64 @@
+import numpy as np
+
+#Pre-drawn random numbers for the hot loops of the operators
+#Instead of one random.* call per gene, a whole block of uniforms or coin flips is drawn from a
+#numpy Generator at once and handed out as plain Python lists, so an operator pays one method call for all
+#the numbers it needs. Blocks are refilled when they run out, a block should hold about a generation's worth.
+class RandomStream:
+    def __init__(self,
+                 rng,
+                 blockSize=4096):
+        self.rng = rng
+        self.blockSize = blockSize
+
+        #Drawn numbers of each kind and the position of the next one to hand out
+        #Kept as plain attributes because these methods run once per genome in the hot loops
+        self.uniforms = []
+        self.uniformPosition = 0
+        self.bits = []
+        self.bitPosition = 0
+
+    #Keeps the numbers not handed out yet and draws at least one more block behind them
+    def Refill(self, buffer, position, draw, count):
+        return buffer[position:] + draw(max(self.blockSize, count)).tolist()
+
+    #count floats between 0 and 1, drawn the same way as random.random()
+    def Uniforms(self, count):
+        position = self.uniformPosition
+        end = position + count
+
+        if end > len(self.uniforms):
+            self.uniforms = self.Refill(self.uniforms, position, self.rng.random, count)
+            position, end = 0, count
+
+        self.uniformPosition = end
+        return self.uniforms[position:end]
+
+    #count booleans that are each True half of the time
+    def CoinFlips(self, count):
+        position = self.bitPosition
+        end = position + count
+
+        if end > len(self.bits):
+            self.bits = self.Refill(self.bits, position, self.DrawBits, count)
+            position, end = 0, count
+
+        self.bitPosition = end
+        return self.bits[position:end]
+
+    def DrawBits(self, count):
+        return self.rng.integers(0, 2, count, dtype=np.int8).astype(bool)
+
+    #Numbers drawn but not handed out yet, as snapshot arrays for a checkpoint
+    #Together with the generator's own state they let a resumed run draw exactly the same numbers
+    def State(self):
+        return {
+            "stream_uniform": np.array(self.uniforms[self.uniformPosition:], dtype=np.float64),
+            "stream_bit": np.array(self.bits[self.bitPosition:], dtype=bool),
+        }
+
+    def Restore(self, snapshot):
+        self.uniforms = snapshot["stream_uniform"].tolist()
+        self.uniformPosition = 0
+        self.bits = snapshot["stream_bit"].tolist()
+        self.bitPosition = 0
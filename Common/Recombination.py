@@ -0,0 +1,41 @@
+import numpy as np
+
+#Batched recombination for real-valued representations
+#representations is a (size, L) matrix with one genome per row. parentsOne and parentsTwo are index arrays
+#with one entry per child, so a whole lambda population is built in one pass. Genes are always paired by position.
+
+#Returns two index arrays of count pairs where parentsOne[i] != parentsTwo[i]
+def ParentPairs(populationSize, count, rng):
+    parentsOne = rng.integers(0, populationSize, count)
+
+    #Drawing from one fewer and skipping over the first parent keeps each pair distinct
+    parentsTwo = rng.integers(0, populationSize - 1, count)
+    parentsTwo += parentsTwo >= parentsOne
+
+    return parentsOne, parentsTwo
+
+#Every gene is the midpoint of the two parents' genes
+def Intermediate(representations, parentsOne, parentsTwo):
+    return (representations[parentsOne] + representations[parentsTwo]) / 2.0
+
+#Every gene is weightOne of the first parent's gene plus weightTwo of the second parent's gene
+def Weighted(representations, parentsOne, parentsTwo, weightOne, weightTwo):
+    return (weightOne * representations[parentsOne]) + (weightTwo * representations[parentsTwo])
+
+#Every gene is copied whole from one of the two parents, picked by a coin flip per gene
+def Discrete(representations, parentsOne, parentsTwo, rng):
+    first = representations[parentsOne]
+    second = representations[parentsTwo]
+
+    return np.where(rng.random(first.shape) < 0.5, first, second)
+
+#Dispatches to one of the variants above by name
+def Recombine(method, representations, parentsOne, parentsTwo, rng, weightOne=0.5, weightTwo=0.5):
+    if method == "intermediate":
+        return Intermediate(representations, parentsOne, parentsTwo)
+    elif method == "weighted":
+        return Weighted(representations, parentsOne, parentsTwo, weightOne, weightTwo)
+    elif method == "discrete":
+        return Discrete(representations, parentsOne, parentsTwo, rng)
+
+    raise ValueError("Unknown recombination method: " + str(method))
@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Common.GenerationLog import MemoryLog
+from Common.Seeding import RootSequence, SeedRecord, SeedScript, SeedTree, SpawnSequences
+from Common.Sweep import LoadScript
+
+#IPOP style restarts
+#A driver runs until its champion and average history say it has stagnated, then it is started again from a fresh
+#population with twice the lambda of the run before, so every restart searches more broadly than the last one.
+#Restarts run in waves of one per worker process, restart k of the whole schedule always getting lambda * 2^k, and
+#the evaluations left in the budget are split evenly over the restarts of each wave, so the total never goes over.
+#The best genome of every restart is kept, and the best of those is the global best.
+#
+#A driver needs an Evolve() generator yielding GenerationStats and a LAMBDA_SIZE, or CMA_LAMBDA when it runs
+#USE_CMAES, like DeJong2ES.py and HimmelblauES/Himmelblau.py. DeJong2ES maximizes fitness, Himmelblau minimizes it.
+#
+#Every restart is seeded with its own child spawned from one root seed, so restarts never share random numbers.
+
+#Generations the champion has to improve within before a run counts as stagnated
+STAGNATION_WINDOW = 50
+
+#Improvements and champion to average gaps smaller than this, relative to the champion, count as nothing
+STAGNATION_TOLERANCE = 1e-8
+
+#Watches the champion and average fitness of a run, one generation at a time
+class StagnationDetector:
+    def __init__(self,
+                 window=STAGNATION_WINDOW,
+                 tolerance=STAGNATION_TOLERANCE,
+                 maximize=True):
+        self.window = window
+        self.tolerance = tolerance
+        self.sign = 1.0 if maximize else -1.0
+
+        self.best = -np.inf
+        self.lastImprovement = 0
+        self.generations = 0
+
+    #Returns why the run stagnated, or None while it is still making progress
+    #"flat"       the champion has not improved for window generations
+    #"converged"  the average has caught up with the champion, the population sits on one point
+    def Update(self, champion, average):
+        champion = self.sign * champion
+        average = self.sign * average
+        scale = self.tolerance * max(1.0, abs(champion))
+
+        if champion > self.best + scale:
+            self.best = champion
+            self.lastImprovement = self.generations
+
+        self.generations += 1
+
+        if self.generations - self.lastImprovement > self.window:
+            return "flat"
+        elif self.generations > self.window and champion - average <= scale:
+            return "converged"
+
+        return None
+
+class RestartResult:
+    def __init__(self,
+                 index,
+                 lambdaSize,
+                 records,
+                 bestRepresentation,
+                 bestFitness,
+                 evals,
+                 reason,
+                 seed):
+        self.index = index
+        self.lambdaSize = lambdaSize
+        self.records = records
+        self.bestRepresentation = bestRepresentation
+        self.bestFitness = bestFitness
+        self.evals = evals
+
+        #What ended the restart: "flat", "converged", "budget", "target" or "finished" when Evolve returned
+        self.reason = reason
+
+        #Seed record of the restart's child in the seed tree
+        self.seed = seed
+
+#The constant that sets a driver's lambda
+def LambdaConstant(module):
+    return "CMA_LAMBDA" if getattr(module, "USE_CMAES", False) else "LAMBDA_SIZE"
+
+#Runs in a worker process
+#Stops the run when it stagnates, reaches target, or its next generation would take it past budget evaluations
+def RunRestart(index, scriptPath, lambdaSize, budget, seed, maximize, target, window, tolerance):
+    module = LoadScript(scriptPath, "restart_" + os.path.splitext(os.path.basename(scriptPath))[0])
+    setattr(module, LambdaConstant(module), lambdaSize)
+    SeedScript(module, seed)
+
+    detector = StagnationDetector(window, tolerance, maximize)
+    sign = 1.0 if maximize else -1.0
+    log = MemoryLog()
+
+    best = None
+    evals = 0
+    reason = "finished"
+
+    generations = module.Evolve()
+    for stats in generations:
+        log.Record(stats.generation, stats.evals, stats.champion, stats.average, stats.diversity)
+
+        if best is None or sign * stats.champion > sign * best.champion:
+            best = stats
+
+        perGeneration = stats.evals - evals
+        evals = stats.evals
+
+        if target is not None and sign * stats.champion >= sign * target:
+            reason = "target"
+        elif evals + perGeneration > budget:
+            reason = "budget"
+        else:
+            reason = detector.Update(stats.champion, stats.average) or "finished"
+
+        if reason != "finished":
+            generations.close()
+            break
+
+    return RestartResult(index, lambdaSize, log.Records(), np.array(best.genome), best.champion, evals, reason, SeedRecord(seed))
+
+#Best of a list of RestartResults
+def GlobalBest(restartResults, maximize=True):
+    if maximize:
+        return max(restartResults, key=lambda result: result.bestFitness)
+
+    return min(restartResults, key=lambda result: result.bestFitness)
+
+#Runs restarts of the driver until budget evaluations are spent or one reaches target
+#Returns the seed tree and one RestartResult per restart, ordered by restart index
+#lambdaSize is the lambda of the first restart, the driver's own LAMBDA_SIZE or CMA_LAMBDA by default
+#A seed of None draws fresh entropy, which is kept in the seed tree
+def RunRestarts(scriptPath, budget, maximize=True, target=None, lambdaSize=None, workers=None, window=STAGNATION_WINDOW, tolerance=STAGNATION_TOLERANCE, seed=0):
+    scriptPath = os.path.abspath(scriptPath)
+    workers = workers or os.cpu_count()
+
+    if lambdaSize is None:
+        module = LoadScript(scriptPath)
+        lambdaSize = getattr(module, LambdaConstant(module))
+
+    if lambdaSize is None:
+        raise ValueError("CMA_LAMBDA has to be set, or a first lambda given, for CMA-ES restarts")
+
+    root = RootSequence(seed)
+    sequences = []
+    restartResults = []
+    remaining = budget
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            #One restart per worker, as long as every restart's share still pays for two generations of its lambda
+            first = len(restartResults)
+            wave = []
+            for index in range(first, first + workers):
+                if 2 * lambdaSize * 2 ** index > remaining // (len(wave) + 1):
+                    break
+                wave.append(index)
+
+            if not wave:
+                break
+
+            share = remaining // len(wave)
+            children = SpawnSequences(root, len(wave))
+            sequences += children
+
+            futures = [pool.submit(RunRestart, index, scriptPath, lambdaSize * 2 ** index, share, child, maximize, target, window, tolerance)
+                       for index, child in zip(wave, children)]
+            results = [future.result() for future in futures]
+
+            restartResults += results
+            remaining -= sum(result.evals for result in results)
+
+            if any(result.reason == "target" for result in results):
+                break
+
+    return SeedTree(root, sequences), restartResults
+
+#python -m Common.Restarts Homework02/HimmelblauES/Himmelblau.py --budget 500000 --minimize --workers 4
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a driver script with IPOP restarts")
+    parser.add_argument("script")
+    parser.add_argument("--budget", type=int, default=1000000, help="evaluations shared by every restart")
+    parser.add_argument("--minimize", action="store_true", help="lower fitness is better, as in Himmelblau.py")
+    parser.add_argument("--target", type=float, default=None, help="fitness that ends every restart once reached")
+    parser.add_argument("--lambda", dest="lambdaSize", type=int, default=None, help="lambda of the first restart")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--window", type=int, default=STAGNATION_WINDOW)
+    parser.add_argument("--tolerance", type=float, default=STAGNATION_TOLERANCE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    maximize = not args.minimize
+    seedTree, restartResults = RunRestarts(args.script, args.budget, maximize, args.target, args.lambdaSize, args.workers, args.window, args.tolerance, args.seed)
+
+    print("# seed " + json.dumps(seedTree))
+
+    for result in restartResults:
+        print("Restart {} Lambda {} Generation {} {} {} {} {}".format(
+            result.index,
+            result.lambdaSize,
+            result.records["generation"][-1],
+            result.evals,
+            result.bestFitness,
+            result.records["average"][-1],
+            result.reason))
+
+    best = GlobalBest(restartResults, maximize)
+    print("Best {} from restart {}: {}".format(best.bestFitness, best.index, best.bestRepresentation.tolist()))
+    print("Evaluations: {} of {}".format(sum(result.evals for result in restartResults), args.budget))
@@ -0,0 +1,65 @@
+import numpy as np
+
+#Fitness proportional (roulette wheel) selection
+#The wheel is built once per generation from the fitness of every member, then all of the
+#parents for that generation are drawn from it in a single batch.
+#
+#"cumulative" keeps a running total of fitness and finds each pick with a binary search, O(log P) per draw
+#"alias" builds a Vose alias table, O(1) per draw at the cost of an O(P) build that is done in Python
+class RouletteWheel:
+    def __init__(self,
+                 fitness,
+                 method="cumulative"):
+        self.fitness = np.asarray(fitness, dtype=np.float64)
+        self.method = method
+
+        if method == "cumulative":
+            self.cumulativeFitness = np.cumsum(self.fitness)
+        elif method == "alias":
+            self.probability, self.alias = BuildAliasTable(self.fitness)
+        else:
+            raise ValueError("Unknown roulette wheel method: " + str(method))
+
+    #Returns the indices of count members picked with probability proportional to their fitness
+    def Draw(self, count, rng):
+        if self.method == "cumulative":
+            selectionChance = rng.uniform(0, self.cumulativeFitness[-1], count)
+            selected = np.searchsorted(self.cumulativeFitness, selectionChance, side="right")
+
+            #Guards against a chance landing exactly on the total fitness
+            return np.minimum(selected, len(self.fitness) - 1)
+
+        #Pick a column uniformly, then keep it or take its alias depending on the column's probability
+        columns = rng.integers(0, len(self.fitness), count)
+        keep = rng.random(count) < self.probability[columns]
+
+        return np.where(keep, columns, self.alias[columns])
+
+#Vose's alias method
+#Every column holds its own index with probability[column] and its alias otherwise
+def BuildAliasTable(fitness):
+    size = len(fitness)
+    scaled = (fitness * size / fitness.sum()).tolist()
+
+    probability = np.ones(size)
+    alias = np.arange(size)
+
+    small = [i for i in range(size) if scaled[i] < 1.0]
+    large = [i for i in range(size) if scaled[i] >= 1.0]
+
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+
+        probability[less] = scaled[less]
+        alias[less] = more
+
+        #The large column gives away what the small column was missing
+        scaled[more] = (scaled[more] + scaled[less]) - 1.0
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+
+    #Whatever is left over is only off from 1 by rounding error, so those columns always keep themselves
+    return probability, alias
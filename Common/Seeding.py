@@ -0,0 +1,49 @@
+import json
+import random
+
+import numpy as np
+
+from Common.RandomStreams import RandomStream
+
+#Seed trees for reproducible and independent runs
+#One root seed becomes a numpy SeedSequence, and every run, island or worker is handed its own child spawned
+#from it. Spawned children are statistically independent of each other, so parallel runs never share a stream,
+#and any one of them can be rebuilt from the root entropy and the child's spawn key alone.
+
+#The root of a seed tree, with fresh entropy from the OS when seed is None
+def RootSequence(seed=None):
+    return np.random.SeedSequence(seed)
+
+#count independent children of root, one per run, island or worker
+def SpawnSequences(root, count):
+    return root.spawn(count)
+
+#The seeds a sequence stands for, as plain JSON values
+#np.random.SeedSequence(record["entropy"], spawn_key=record["spawn_key"]) rebuilds the sequence
+def SeedRecord(sequence):
+    return {"entropy": sequence.entropy, "spawn_key": list(sequence.spawn_key)}
+
+#Root entropy and the spawn key of every child, written at the top of a run's output
+def SeedTree(root, children=()):
+    return {"entropy": root.entropy, "children": [list(child.spawn_key) for child in children]}
+
+#"# seed {...}" line that starts a text output, ignored by anything reading the generation lines
+def SeedLine(record):
+    return "# seed " + json.dumps(record) + "\n"
+
+#Seeds the random module, the script's numpy generator and its RandomStream from one seed or SeedSequence
+#and returns the sequence used
+def SeedScript(module, seed):
+    sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+    #The numpy generator takes the first four 64 bit words of the sequence's state,
+    #so the random module is seeded with the next four to keep the two apart
+    random.seed(int.from_bytes(sequence.generate_state(8, np.uint64)[4:].tobytes(), "little"))
+
+    if hasattr(module, "rng"):
+        module.rng = np.random.default_rng(sequence)
+
+    if hasattr(module, "stream"):
+        module.stream = RandomStream(module.rng, module.stream.blockSize)
+
+    return sequence
@@ -0,0 +1,86 @@
+import numpy as np
+
+#Uniform grid over 2-D points for neighbour queries
+#Every point is hashed to the square cell of side cellSize it falls in, and the point indices are kept sorted by cell,
+#so the points of any cell are one contiguous slice found with a binary search. A query only looks at the 3x3 block
+#of cells around each point, which finds every neighbour closer than cellSize without comparing all pairs.
+#The grid is cheap to build (one sort), so it is simply built again whenever the points move.
+class SpatialGrid:
+    def __init__(self,
+                 points,
+                 cellSize,
+                 padding=1):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.cellSize = cellSize
+
+        #Cells are counted from the lowest point, with padding empty rows and columns around the edge
+        #so a block of cells around an edge cell never wraps onto the other side of the grid
+        cells = np.floor((self.points - self.points.min(axis=0)) / cellSize).astype(np.int64) + padding
+        self.columns = int(cells[:, 1].max()) + 1 + padding
+
+        self.keys = cells[:, 0] * self.columns + cells[:, 1]
+        self.order = np.argsort(self.keys, kind="stable")
+        self.sortedKeys = self.keys[self.order]
+
+    #Start in the sorted order and number of points of the 9 cells around each of indices, as (len(indices), 9) arrays
+    def BlockSlices(self, indices):
+        offsets = np.array([dx * self.columns + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+
+        query = (self.keys[indices, None] + offsets).ravel()
+        low = np.searchsorted(self.sortedKeys, query, "left")
+        counts = np.searchsorted(self.sortedKeys, query, "right") - low
+
+        return low.reshape(len(indices), 9), counts.reshape(len(indices), 9)
+
+    #Number of candidates of every point, itself included
+    def CandidateCounts(self, indices=None):
+        if indices is None:
+            indices = np.arange(len(self.points))
+
+        return self.BlockSlices(indices)[1].sum(axis=1)
+
+    #Every (point, other) index pair with other in the 3x3 block of cells around point, each point paired with itself too
+    #indices limits the query to some of the points
+    def Candidates(self, indices=None):
+        if indices is None:
+            indices = np.arange(len(self.points))
+
+        low, counts = self.BlockSlices(indices)
+        low = low.ravel()
+        counts = counts.ravel()
+
+        #Expand every cell's slice of the sorted order into one index per point in it
+        total = counts.sum()
+        starts = np.repeat(low - (np.cumsum(counts) - counts), counts)
+        others = self.order[starts + np.arange(total)]
+        owners = np.repeat(indices, counts.reshape(len(indices), 9).sum(axis=1))
+
+        return owners, others
+
+    #Distances between different points of every candidate pair
+    def CandidateDistances(self, indices=None):
+        owners, others = self.Candidates(indices)
+
+        keep = owners != others
+        owners = owners[keep]
+        others = others[keep]
+
+        difference = self.points[owners] - self.points[others]
+        return owners, others, np.hypot(difference[:, 0], difference[:, 1])
+
+    #Every ordered pair of different points no further apart than radius, with their distance
+    #radius can be at most cellSize
+    #indices limits the pairs to those owned by some of the points
+    def NeighbourPairs(self, radius, indices=None):
+        owners, others, distances = self.CandidateDistances(indices)
+        keep = distances <= radius
+
+        return owners[keep], others[keep], distances[keep]
+
+    #The points split into consecutive batches of about maxCandidates candidate pairs each, for queries that would
+    #not fit in memory at once when the points crowd into a few cells
+    def Batches(self, maxCandidates):
+        ends = np.cumsum(self.CandidateCounts())
+        cuts = np.searchsorted(ends, np.arange(maxCandidates, ends[-1], maxCandidates), "right") if len(ends) else []
+
+        return [batch for batch in np.split(np.arange(len(self.points)), np.unique(cuts)) if len(batch)]
@@ -0,0 +1,80 @@
+import heapq
+from operator import attrgetter
+
+import numpy as np
+
+from Common.Tournament import RunTournaments
+
+#Survivor selection for the ES drivers
+#Every strategy picks mu survivors from the parents and their offspring (genomes with a fitness attribute):
+#
+#"plus"    the mu best of parents and offspring together, (mu + lambda)
+#"comma"   the mu best offspring, every parent is dropped, (mu, lambda)
+#"hybrid"  the best elites offspring always survive, the worst culled never do, and the rest of mu
+#          are tournament winners among the others, the scheme the ES drivers have always used
+#"age"     plus selection, but a genome that has already survived maxAge generations is dropped
+#
+#Truncation keeps a heap of the mu best while it walks the candidates, so picking mu out of
+#mu + lambda costs O((mu + lambda) log mu) instead of sorting everything.
+#
+#Genomes are compared on the attribute named by key, fitness unless a driver ranks them on something else
+#(like the niched cost of Common/Niching.py).
+
+#The count best genomes, best first
+def Truncate(genomes, count, maximize=True, key="fitness"):
+    if maximize:
+        return heapq.nlargest(count, genomes, key=attrgetter(key))
+
+    return heapq.nsmallest(count, genomes, key=attrgetter(key))
+
+def HybridElitist(offspring, mu, rng, rule, maximize=True, elites=5, culled=5, tournamentSize=9, upsetChance=0.2, key="fitness"):
+    fitness = np.array([getattr(genome, key) for genome in offspring])
+    n = len(fitness)
+
+    #Partition the indices so the lowest fitnesses come first and the highest last, without sorting the rest
+    if maximize:
+        order = np.argpartition(fitness, (culled - 1, n - elites))
+        remaining = order[culled:]
+        best = order[n - elites:]
+    else:
+        order = np.argpartition(fitness, (elites - 1, n - culled))
+        remaining = order[:n - culled]
+        best = order[:elites]
+
+    survivors = [offspring[i] for i in best]
+
+    #Shuffle the remaining indices once and split them into groups, so no genome is in two tournaments
+    tournaments = mu - elites
+    groups = rng.permutation(remaining)[:tournaments * tournamentSize].reshape(tournaments, tournamentSize)
+
+    survivors += [offspring[i] for i in RunTournaments(groups, fitness, rule, rng, maximize, upsetChance)]
+
+    return survivors
+
+#The genomes that compete for survival under strategy
+def CompetingGenomes(strategy, parents, offspring, maxAge=10):
+    if strategy == "comma" or strategy == "hybrid":
+        return offspring
+    elif strategy == "plus":
+        return parents + offspring
+    elif strategy == "age":
+        return [genome for genome in parents if genome.age < maxAge] + offspring
+
+    raise ValueError("Unknown survivor strategy: " + str(strategy))
+
+#Returns the mu survivors chosen by strategy
+#rule and upsetChance are the tournament settings of the hybrid strategy, maxAge is the age limit of the age strategy
+#Survivors grow one generation older, offspring start with an age of 0
+def SelectSurvivors(strategy, parents, offspring, mu, rng, maximize=True, rule="fixed", upsetChance=0.2, maxAge=10, key="fitness"):
+    candidates = CompetingGenomes(strategy, parents, offspring, maxAge)
+
+    if strategy == "hybrid":
+        survivors = HybridElitist(candidates, mu, rng, rule, maximize, upsetChance=upsetChance, key=key)
+    else:
+        survivors = Truncate(candidates, mu, maximize, key)
+
+    #A genome that won more than one tournament is still only one generation older
+    for genome in {id(genome): genome for genome in survivors}.values():
+        genome.age += 1
+
+    return survivors
@@ -0,0 +1,153 @@
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Common.GenerationLog import GENERATION_DTYPE, MemoryLog
+from Common.Seeding import RootSequence, SeedScript, SeedTree, SpawnSequences
+
+#Parameter sweeps over the module constants of a driver script
+#Every combination of the grid is run once per seed. Seeds are children spawned from one root seed, and
+#combinations share them, so the i-th run of every combination starts from the same random numbers. Runs are spread over a process pool and
+#every run's per generation stats end up in one combined result.
+#
+#A driver only needs module level constants and a Run(log) function, like DeJong2GA.py,
+#DeJong2ES.py and HimmelblauES/Himmelblau.py.
+
+#Loads a driver script from its path as a fresh module, so constants set for one run never leak into another
+#The module is registered under moduleName so its functions and genomes can be pickled for a process pool
+def LoadScript(scriptPath, moduleName=None):
+    if moduleName is None:
+        moduleName = "sweep_" + os.path.splitext(os.path.basename(scriptPath))[0]
+
+    spec = importlib.util.spec_from_file_location(moduleName, scriptPath)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[moduleName] = module
+    spec.loader.exec_module(module)
+
+    return module
+
+#Runs in a worker process
+def RunOne(scriptPath, parameters, seed):
+    module = LoadScript(scriptPath)
+
+    for name, value in parameters.items():
+        setattr(module, name, value)
+
+    SeedScript(module, seed)
+
+    log = MemoryLog()
+    module.Run(log)
+
+    return log.Records()
+
+#Every combination of the grid's values, as one dictionary of constants per combination
+def GridCombinations(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+class SweepResult:
+    def __init__(self,
+                 runs,
+                 records,
+                 seedTree):
+        #One row per run: its index, the constants it was given and the index of its seed in the seed tree
+        self.runs = runs
+
+        #Every recorded generation of every run, tagged with the index of the run it came from
+        self.records = records
+
+        #Root entropy and the spawn key of every seed, from Common.Seeding.SeedTree
+        self.seedTree = seedTree
+
+    def Save(self, fileString):
+        np.savez(fileString, runs=self.runs, records=self.records, seed_tree=json.dumps(self.seedTree))
+
+    #Records belonging to a single run
+    def Run(self, index):
+        return self.records[self.records["run"] == index]
+
+def LoadSweep(fileString):
+    data = np.load(fileString)
+    return SweepResult(data["runs"], data["records"], json.loads(str(data["seed_tree"])))
+
+#Runs every combination of grid for seeds seeds spawned from rootSeed and gathers the results
+#Column type of a constant in the runs table, numbers (and booleans) as floats and anything else as its text
+def ParameterDtype(values):
+    if all(isinstance(value, (int, float)) for value in values):
+        return np.dtype("<f8")
+
+    return np.dtype("<U{}".format(max(len(str(value)) for value in values)))
+
+#grid maps constant names to the list of values to try, e.g. {"MUTATION_RATE": [0.1, 0.8]}
+#A rootSeed of None draws fresh entropy, which is kept in the result's seed tree
+def Sweep(scriptPath, grid, seeds, workers=None, rootSeed=0):
+    scriptPath = os.path.abspath(scriptPath)
+    combinations = GridCombinations(grid)
+
+    root = RootSequence(rootSeed)
+    sequences = SpawnSequences(root, seeds)
+    tasks = [(parameters, seed) for parameters in combinations for seed in range(seeds)]
+
+    runDtype = np.dtype([("run", "<i8")] + [(name, ParameterDtype(grid[name])) for name in grid] + [("seed", "<i8")])
+    runs = np.empty(len(tasks), dtype=runDtype)
+
+    recordDtype = np.dtype([("run", "<i8")] + [(name, GENERATION_DTYPE[name]) for name in GENERATION_DTYPE.names])
+    results = []
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(RunOne, scriptPath, parameters, sequences[seed]) for parameters, seed in tasks]
+
+        for index, ((parameters, seed), future) in enumerate(zip(tasks, futures)):
+            runs[index] = (index, *(value if runDtype[name].kind == "f" else str(value) for name, value in parameters.items()), seed)
+
+            generations = future.result()
+            tagged = np.empty(len(generations), dtype=recordDtype)
+            tagged["run"] = index
+            for name in GENERATION_DTYPE.names:
+                tagged[name] = generations[name]
+
+            results.append(tagged)
+
+    records = np.concatenate(results) if results else np.empty(0, dtype=recordDtype)
+
+    return SweepResult(runs, records, SeedTree(root, sequences))
+
+#"10" -> 10, "0.1" -> 0.1, "True" -> True, "None" -> None, anything else stays a string like "process"
+def ParseGridValue(value):
+    if value in ("True", "False", "None"):
+        return {"True": True, "False": False, "None": None}[value]
+
+    for parse in (int, float):
+        try:
+            return parse(value)
+        except ValueError:
+            pass
+
+    return value
+
+#"MUTATION_RATE=0.1,0.8" -> ("MUTATION_RATE", [0.1, 0.8]), "EVALUATOR=thread,process" -> ("EVALUATOR", ["thread", "process"])
+def ParseGridArgument(argument):
+    name, values = argument.split("=", 1)
+    return name, [ParseGridValue(value) for value in values.split(",")]
+
+#python -m Common.Sweep Homework03/DeJong2GA/DeJong2GA.py --grid MUTATION_RATE=0.1,0.8 --grid CROSSOVER_RATE=0.1,0.5 --seeds 10 --out sweep.npz
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a driver script over a grid of its constants")
+    parser.add_argument("script")
+    parser.add_argument("--grid", action="append", default=[], help="CONSTANT=value,value,...")
+    parser.add_argument("--seeds", type=int, default=1, help="number of seeds run for every combination")
+    parser.add_argument("--root-seed", type=int, default=0, help="seed the run seeds are spawned from")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="sweep.npz")
+    args = parser.parse_args()
+
+    result = Sweep(args.script, dict(ParseGridArgument(argument) for argument in args.grid), args.seeds, args.workers, args.root_seed)
+    result.Save(args.out)
+
+    print("{} runs, {} generations saved to {}".format(len(result.runs), len(result.records), args.out))
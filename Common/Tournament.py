@@ -0,0 +1,59 @@
+import numpy as np
+
+#Batched knockout tournaments
+#groups is a (T, k) matrix of member indices, one row per tournament, and fitness holds the fitness of every member.
+#All T tournaments are played at once: each step picks a random match in every tournament, removes both
+#competitors and puts the winner back, the same knockout the scripts used to play one tournament at a time.
+#
+#Match rules:
+#"deterministic"  the better genome always wins
+#"fixed"          the better genome wins unless an upset with probability upsetChance happens
+#"proportional"   the worse genome wins with probability worse / (better + worse), maximizing fitness only
+#
+#On a tie the second competitor of the match counts as the better genome.
+def RunTournaments(groups, fitness, rule, rng, maximize=True, upsetChance=0.2):
+    competitors = np.array(groups, dtype=np.intp)
+    fitness = np.asarray(fitness, dtype=np.float64)
+    tournaments = len(competitors)
+    rows = np.arange(tournaments)
+
+    while competitors.shape[1] > 1:
+        width = competitors.shape[1]
+
+        #Two different random positions in every tournament
+        first = rng.integers(0, width, tournaments)
+        second = rng.integers(0, width - 1, tournaments)
+        second += second >= first
+
+        one = competitors[rows, first]
+        two = competitors[rows, second]
+
+        if maximize:
+            oneBetter = fitness[one] > fitness[two]
+        else:
+            oneBetter = fitness[one] < fitness[two]
+
+        better = np.where(oneBetter, one, two)
+        worse = np.where(oneBetter, two, one)
+
+        if rule == "deterministic":
+            winners = better
+        else:
+            if rule == "fixed":
+                threshold = upsetChance
+            elif rule == "proportional":
+                total = fitness[better] + fitness[worse]
+                threshold = np.divide(fitness[worse], total, out=np.full(tournaments, 0.5), where=total != 0)
+            else:
+                raise ValueError("Unknown tournament rule: " + str(rule))
+
+            winners = np.where(rng.random(tournaments) > threshold, better, worse)
+
+        #Drop both competitors of every match and add the winner at the end for the next round
+        keep = np.ones(competitors.shape, dtype=bool)
+        keep[rows, first] = False
+        keep[rows, second] = False
+
+        competitors = np.concatenate((competitors[keep].reshape(tournaments, width - 2), winners[:, None]), axis=1)
+
+    return competitors[:, 0]
@@ -1,6 +1,18 @@
 import random
-import math
 import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from Common.Evaluation import GetEvaluator
+from Common.FitnessCache import FitnessCache
+from Common.GenerationLog import GenerationStats
+from Common.Instrumentation import MonitorScript
+from Common.ObjectiveTables import ObjectiveTables
+from Common.RandomStreams import RandomStream
+from Common.Seeding import SeedLine, SeedRecord, SeedScript
+from Common.Tournament import RunTournaments
 
 CLASSES = ["artificer", "bard", "barbarian", "cleric", "druid", "fighter", "monk", "paladin", "ranger", "rogue", "sorcerer", "warlock", "wizard"]
 
@@ -8,6 +20,13 @@ LAMBDA_SIZE = 100
 MU_SIZE = 20
 MUTATION_RATE = 0.1
 NUMBER_OF_GENERATIONS = 10000
+SEED = None
+INSTRUMENT = False
+EVALUATOR = "serial"
+EVALUATION_WORKERS = None
+
+#Representations whose fitness is remembered, 0 turns the cache off
+FITNESS_CACHE_SIZE = 4096
 
 PROFICIENCY_BONUS = 2
 
@@ -19,6 +38,15 @@ LAST_POPULATION_FILE = "point_removal_population.txt"
 
 StatisticsDictionary = {}
 
+rng = np.random.default_rng()
+stream = RandomStream(rng)
+fitnessCache = FitnessCache(FITNESS_CACHE_SIZE)
+
+cumulative_evals = 0
+
+#Population of the generation Evolve yielded last, Run writes the population dumps from it
+currentPopulation = None
+
 #Objects for Genome and Population
 #Representation = [class, CHA, WIS, INT, CON, DEX, STR]
 class Genome:
@@ -45,6 +73,8 @@ def getFitness(g):
 
 #Creates 
 def InitializeGenome(pointBuy):
+    global cumulative_evals
+
     rep = []
     points = pointBuy
 
@@ -68,12 +98,16 @@ def InitializeGenome(pointBuy):
     #Create genome and set its fitness
     genome = Genome(rep, 0.0)
     genome.fitness = Objective(genome)
+    cumulative_evals += 1
     return genome
 
 def InitializePopulation(pointBuy):
     
     members = []
 
+    #Compile the objective tables for the current constants before the first lookups
+    OBJECTIVE_TABLES.Refresh()
+
     #Create members of population with size mu
     for i in range(MU_SIZE):
         members.append(InitializeGenome(pointBuy))
@@ -97,11 +131,10 @@ def CreateLambdaPopulation(population, pointBuy):
         parents = ParentSelection(population)
 
         for i in range(10):
-            offspringRep = []
-            while len(offspringRep) < 7 or sum(offspringRep[1:]) != (60 + pointBuy):
-
-                #perform recombination on parents
-                offspringRep = Recombination(parents[0], parents[1])
+            #perform recombination on parents until the child spends exactly the point buy
+            offspringRep = Recombination(parents[0], parents[1])
+            while sum(offspringRep[1:]) != (60 + pointBuy):
+                offspringRep = RetryRecombination(parents[0], parents[1])
             
             offspring = Genome(offspringRep, 0.0)
 
@@ -109,14 +142,15 @@ def CreateLambdaPopulation(population, pointBuy):
             if(random.uniform(0,1) < MUTATION_RATE):
                 offspring = Mutation(offspring)
 
-            #Get fitness of offspring
-            offspring.fitness = Objective(offspring)
             members.append(offspring)
             offspringSet.append(offspring)
 
         population.members.remove(parents[0])
         population.members.remove(parents[1])
         
+    #Get fitness of every offspring at once
+    EvaluateGenomes(members)
+
     #create population from members
     lambdaPop = Population(members, 0.0, "", 0.0)
 
@@ -130,31 +164,44 @@ def Recombination(parentOne, parentTwo):
     #as bad as the parent, as it cannot directly take the bad parent's attributes
     child = []
 
-    child.append(parentOne.representation[0] if random.randint(1,2) == 1 else parentTwo.representation[0])
+    #One pre-drawn coin flip for the class and each of the six stats
+    coinFlips = stream.CoinFlips(7)
+
+    child.append(parentOne.representation[0] if coinFlips[0] else parentTwo.representation[0])
 
     for i in range(1,7):
-        child.append(int(parentOne.representation[i]) if random.randint(1,2) == 1 else int(parentTwo.representation[i]))
+        child.append(int(parentOne.representation[i]) if coinFlips[i] else int(parentTwo.representation[i]))
 
     return child
 
+#Another recombination of the same parents, after a child that did not spend exactly the point buy
+#Kept apart from Recombination so retries can be counted
+def RetryRecombination(parentOne, parentTwo):
+    return Recombination(parentOne, parentTwo)
+
 def Mutation(genome):
     
-    toIndex = 0
-    fromIndex = 0
     if(random.randint(1,2) == 1):
         genome.representation[0] = CLASSES[random.randint(0, len(CLASSES)-1)]
     else:
-        while True:
-            toIndex = random.randint(1,6)
-            fromIndex = random.randint(1,6)
-            
-            if(genome.representation[fromIndex] - 1 >= 6 and genome.representation[toIndex] + 1 <= 18):
-                genome.representation[fromIndex] -= 1
-                genome.representation[toIndex] += 1
-                break
+        #keep trying until a point can be moved without leaving the stat limits
+        while not MutationAttempt(genome):
+            pass
 
     return genome
 
+#Tries to move one point from a random stat to another, returns whether the move was made
+def MutationAttempt(genome):
+    toIndex = random.randint(1,6)
+    fromIndex = random.randint(1,6)
+
+    if(genome.representation[fromIndex] - 1 >= 6 and genome.representation[toIndex] + 1 <= 18):
+        genome.representation[fromIndex] -= 1
+        genome.representation[toIndex] += 1
+        return True
+
+    return False
+
 def ParentSelection(muPopulation):
     #randomly chooses two parents
     parents = random.sample(muPopulation.members, 2)
@@ -163,53 +210,21 @@ def ParentSelection(muPopulation):
 
 def SurvivorSelection(lambdaPopulation):
 
-    survivors = []
+    members = lambdaPopulation.members
+    fitness = np.array([genome.fitness for genome in members])
 
-    #sort members from best to worst
-    lambdaPopulation.members.sort(key=lambda g: g.fitness)
-    # #remove the 5 genomes with the lowest fitness to prevent them from surviving
-    # lambdaPopulation.members = lambdaPopulation.members[5:]
+    #Shuffle the indices once and split them into 20 groups of 5, so no genome is in two tournaments
+    groups = rng.permutation(len(members))[:100].reshape(20, 5)
 
-    # #preserve the 5 genomes with the highest fitness to ensure we keep our current best genomes
-    # survivors = lambdaPopulation.members[len(lambdaPopulation.members)-5:]
-
-    for i in range(20):
-        competitors = random.sample(lambdaPopulation.members, 5) if len(lambdaPopulation.members) > 5 else lambdaPopulation.members
-        
-        for competitor in competitors:
-            lambdaPopulation.members.remove(competitor)
-
-        #Add tournament winners to list of survivors
-        survivors.append(runTournament(competitors))
+    #Add tournament winners to list of survivors, every tournament is played at once
+    #The weaker genome of each match wins with probability weaker / (weaker + stronger)
+    survivors = [members[i] for i in RunTournaments(groups, fitness, "proportional", rng)]
 
     #create population from survivors
     population = Population(survivors, 0.0, "", 0.0)
     
     return AddPopulationStats(population)
     
-def runTournament(competitors):
-
-    #Run until there is one final winner
-    while len(competitors) > 1:
-        match = random.sample(competitors, 2)
-
-        competitors.remove(match[0])
-        competitors.remove(match[1])
-
-        #Adds winner of match back to the end of the array to be cycled back during next round
-        if(match[0].fitness > match[1].fitness):
-            threshold = match[1].fitness / (match[0].fitness + match[1].fitness)
-            competitors.append(match[0] if random.uniform(0, 1) > threshold else match[1])
-        else:
-            threshold = match[0].fitness / (match[0].fitness + match[1].fitness)
-            competitors.append(match[1] if random.uniform(0, 1) > threshold else match[0])
-
-    #Assign to winner variable as a prize for survival
-    winner = competitors[0]
-
-    return winner
-
-
 def AddPopulationStats(population):
     champion = population.members[0]
     championFitness = population.members[0].fitness
@@ -233,7 +248,21 @@ def AddPopulationStats(population):
     return population
 
 
-def Objective(genome):
+#Sets the fitness of every genome through the EVALUATOR backend, genomes the fitness cache has seen are not evaluated again
+#Every genome counts as an evaluation, cached or not
+def EvaluateGenomes(genomes):
+    global cumulative_evals
+
+    OBJECTIVE_TABLES.Refresh()
+    fitness = fitnessCache.Evaluate(GetEvaluator(EVALUATOR, EVALUATION_WORKERS), Objective, genomes)
+    for genome, value in zip(genomes, fitness):
+        genome.fitness = value
+
+    cumulative_evals += len(genomes)
+    return genomes
+
+#The objective the lookup tables are compiled from, it works on numbers and on numpy arrays of scores alike
+def ComputeObjective(genome):
     rep = genome.representation
 
     charClass = rep[0]
@@ -405,92 +434,146 @@ def calculate_save(score):
     return 8 + calculate_bonus(score) + PROFICIENCY_BONUS
 
 def calculate_bonus(score):
-    return math.floor((score - 10.0) / 2.0)
-
-def printStats(out, generation, population):
-    #CHA, WIS, INT, CON, DEX, STR
-    out.write("Generation {} | Average Fitness: {}\n\tChampion: {}, CHA {}, WIS {}, INT {}, CON {}, DEX {}, STR {} - FITNESS {}\n".format(
-    generation, 
-    population.average_fitness,
-    population.champion.representation[0],
-    population.champion.representation[1],
-    population.champion.representation[2],
-    population.champion.representation[3],
-    population.champion.representation[4],
-    population.champion.representation[5],
-    population.champion.representation[6],
-    population.champion_fitness))
-
-with open(FILE_STRING, "w") as os:
-    with open(LAST_POPULATION_FILE, "w") as lastPop:
-
-        while True:
-            print("How many points do you have to spend? (3 - 15)")
-            
-            points = int(input())
-            if points < 3 or points > 15:
-                print("INVALID INPUT")
-            else:
-                break
-
-        population = InitializePopulation(points)
-            
-
-        os.write("DND 5e Character Generator | ES | Mu: {} | Lambda: {} |  Generation {} | Average Fitness: {}\n\tChampion: {}, CHA {}, WIS {}, INT {}, CON {}, DEX {}, STR {} | FITNESS {}\n".format(
-        MU_SIZE, 
-        LAMBDA_SIZE,
-        0,
-        population.average_fitness,
-        population.champion.representation[0],
-        population.champion.representation[1],
-        population.champion.representation[2],
-        population.champion.representation[3],
-        population.champion.representation[4],
-        population.champion.representation[5],
-        population.champion.representation[6],
-        population.champion_fitness))
-
-        for genome in population.members:
-            lastPop.write("{}, CHA {}, WIS {}, INT {}, CON {}, DEX {}, STR {}, FITNESS {}\n".format(
-                genome.representation[0],
-                genome.representation[1],
-                genome.representation[2],
-                genome.representation[3],
-                genome.representation[4],
-                genome.representation[5],
-                genome.representation[6],
-                genome.fitness
-            ))
-        lastPop.write("\n")
-
-        for generation in range(1, NUMBER_OF_GENERATIONS):
-
-            #create lambda population
-            lambdaPopulation = CreateLambdaPopulation(population, points)
-
-            #create mu population from lambda population
-            population = SurvivorSelection(lambdaPopulation)
-
-            if(generation % 100 == 0):
-                printStats(os, generation, population)
-
-            
-            if population.average_fitness > 27:
-                print("THRESHOLD MET - Generation " + str(generation))
-                printStats(os, generation, population)
-                break
-
-            for genome in population.members:
-                lastPop.write("{}, CHA {}, WIS {}, INT {}, CON {}, DEX {}, STR {}, FITNESS {}\n".format(
-                    genome.representation[0],
-                    genome.representation[1],
-                    genome.representation[2],
-                    genome.representation[3],
-                    genome.representation[4],
-                    genome.representation[5],
-                    genome.representation[6],
-                    genome.fitness
-                ))
-            lastPop.write("\n")
+    return (score - 10) // 2
 
+#Hit and miss counts of the fitness cache since the last output line, nothing when the cache is off
+def CacheStats():
+    return " | " + fitnessCache.Emit() if fitnessCache.Enabled() else ""
 
+def printStats(out, stats):
+    #CHA, WIS, INT, CON, DEX, STR
+    out.write("Generation {} | Average Fitness: {}\n\tChampion: {}, CHA {}, WIS {}, INT {}, CON {}, DEX {}, STR {} - FITNESS {}{}\n".format(
+    stats.generation, 
+    stats.average,
+    stats.genome[0],
+    stats.genome[1],
+    stats.genome[2],
+    stats.genome[3],
+    stats.genome[4],
+    stats.genome[5],
+    stats.genome[6],
+    stats.champion,
+    CacheStats()))
+
+def printPopulation(lastPop, population):
+    for genome in population.members:
+        lastPop.write("{}, CHA {}, WIS {}, INT {}, CON {}, DEX {}, STR {}, FITNESS {}\n".format(
+            genome.representation[0],
+            genome.representation[1],
+            genome.representation[2],
+            genome.representation[3],
+            genome.representation[4],
+            genome.representation[5],
+            genome.representation[6],
+            genome.fitness
+        ))
+    lastPop.write("\n")
+
+#Every constant the objective depends on, the lookup tables are compiled again when one of them changes
+def ObjectiveConstants():
+    return (KLARG_STATS, TARGET_AC, PROFICIENCY_BONUS)
+
+OBJECTIVE_TABLES = ObjectiveTables(ComputeObjective, CLASSES, ObjectiveConstants)
+
+#Looks the genome's fitness up in the tables compiled from ComputeObjective
+def Objective(genome):
+    return OBJECTIVE_TABLES.Lookup(genome)
+
+#Functions timed and counted when INSTRUMENT is set
+PHASES = {
+    "selection": ["ParentSelection", "SurvivorSelection", "RunTournaments"],
+    "variation": ["Recombination", "Mutation"],
+    "evaluation": ["Objective"],
+    "stats": ["AddPopulationStats"],
+}
+COUNTERS = {
+    "evals": ["Objective"],
+    "recombination_retries": ["RetryRecombination"],
+    "mutation_attempts": ["MutationAttempt"],
+}
+
+#One generation's statistics with a copy of its champion's representation, higher fitness is better
+def GenerationStatistics(generation, population):
+    return GenerationStats(generation, cumulative_evals, population.champion_fitness, population.average_fitness, 0.0, tuple(population.champion.representation))
+
+#Runs the algorithm from a fresh population, yielding a GenerationStats for every generation
+#Nothing is written anywhere, and closing the generator stops the run
+def Evolve(points):
+    global fitnessCache, cumulative_evals, currentPopulation
+    fitnessCache = FitnessCache(FITNESS_CACHE_SIZE)
+    cumulative_evals = 0
+
+    currentPopulation = InitializePopulation(points)
+
+    yield GenerationStatistics(0, currentPopulation)
+
+    for generation in range(1, NUMBER_OF_GENERATIONS):
+
+        #create lambda population
+        lambdaPopulation = CreateLambdaPopulation(currentPopulation, points)
+
+        #create mu population from lambda population
+        currentPopulation = SurvivorSelection(lambdaPopulation)
+
+        yield GenerationStatistics(generation, currentPopulation)
+
+    return currentPopulation
+
+#Runs the algorithm from a fresh population, writing progress to out and every population but the one that met the threshold to lastPop
+#The run stops once the average fitness is over 27
+def Run(points, out, lastPop):
+    generations = Evolve(points)
+
+    for stats in generations:
+        if stats.generation == 0:
+            out.write("DND 5e Character Generator | ES | Mu: {} | Lambda: {} |  Generation {} | Average Fitness: {}\n\tChampion: {}, CHA {}, WIS {}, INT {}, CON {}, DEX {}, STR {} | FITNESS {}\n".format(
+            MU_SIZE, 
+            LAMBDA_SIZE,
+            0,
+            stats.average,
+            stats.genome[0],
+            stats.genome[1],
+            stats.genome[2],
+            stats.genome[3],
+            stats.genome[4],
+            stats.genome[5],
+            stats.genome[6],
+            stats.champion))
+
+            printPopulation(lastPop, currentPopulation)
+            continue
+
+        if(stats.generation % 100 == 0):
+            printStats(out, stats)
+
+        if stats.average > 27:
+            print("THRESHOLD MET - Generation " + str(stats.generation))
+            printStats(out, stats)
+            generations.close()
+            break
+
+        printPopulation(lastPop, currentPopulation)
+
+    return currentPopulation
+
+if __name__ == "__main__":
+    sequence = SeedScript(sys.modules[__name__], SEED)
+
+    with open(FILE_STRING, "w") as out:
+        with open(LAST_POPULATION_FILE, "w") as lastPop:
+
+            while True:
+                print("How many points do you have to spend? (3 - 15)")
+
+                points = int(input())
+                if points < 3 or points > 15:
+                    print("INVALID INPUT")
+                else:
+                    break
+
+            out.write(SeedLine(SeedRecord(sequence)))
+
+            if INSTRUMENT:
+                out = MonitorScript(sys.modules[__name__], out)
+
+            Run(points, out, lastPop)
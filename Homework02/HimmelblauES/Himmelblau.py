@@ -1,19 +1,60 @@
+import argparse
 import random
 import math
 import json
 import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from Common.CMAES import CMAES, DefaultLambda
+from Common.Diversity import PopulationDiameter
+from Common.Evaluation import GetEvaluator
+from Common.GenerationLog import GenerationStats, MemoryLog, OpenLog, RecordGenerations
+from Common.Instrumentation import MonitorScript
+from Common.Niching import NichedCosts
+from Common.RandomStreams import RandomStream
+from Common.Recombination import ParentPairs, Recombine
+from Common.Seeding import SeedRecord, SeedScript
+from Common.SurvivorStrategies import CompetingGenomes, SelectSurvivors
 
 LAMBDA_SIZE = 100
 MU_SIZE = 15
 MUTATION_RATE = 0.1
 NUMBER_OF_GENERATIONS = 1000
+SEED = None
+RECOMBINATION_METHOD = "intermediate"
+SURVIVOR_STRATEGY = "hybrid"
+MAX_AGE = 10
+NICHING = "clearing"
+NICHE_RADIUS = 2.0
+NICHE_CAPACITY = 2
+SHARING_ALPHA = 1.0
+SHARING_MODE = "exact"
+OPTIMA_TOLERANCE = 0.1
+NICHING_CHECK_SEED = 0
+EVALUATOR = "serial"
+EVALUATION_WORKERS = None
+USE_CMAES = False
+CMA_SIGMA = 5.0
+CMA_LAMBDA = None
+BINARY_LOG = False
+LOG_STRIDE = 1
+INSTRUMENT = False
 
 cumulative_evals = 0
 
 FILE_STRING = "./Output.txt"
 
+#The four minima of Himmelblau's function, all with a value of 0
+HIMMELBLAU_MINIMA = [(3.0, 2.0), (-2.805118, 3.131312), (-3.779310, -3.283186), (3.584428, -1.848126)]
+
 StatisticsDictionary = {}
 
+rng = np.random.default_rng()
+stream = RandomStream(rng)
+
 #Objects for Genome and Population
 class Genome:
     def __init__(self,
@@ -22,6 +63,9 @@ class Genome:
         self.representation = representation
         self.fitness = fitness
 
+        #Generations this genome has survived, used by the "age" survivor strategy
+        self.age = 0
+
 class Population:
     def __init__(self, 
                  members, 
@@ -49,10 +93,8 @@ def InitializeGenome():
     rep.append(random.gauss(0, 1))
     rep.append(random.gauss(0, 1))
 
-    #Create genome and set its fitness
-    genome = Genome(rep, 0.0)
-    genome.fitness = HimmelblauFitness(genome)
-    return genome
+    #Create genome, its fitness is set along with the rest of the population
+    return Genome(rep, 0.0)
 
 def InitializePopulation():
     
@@ -61,6 +103,8 @@ def InitializePopulation():
     #Create members of population with size mu
     for i in range(MU_SIZE):
         members.append(InitializeGenome())
+
+    EvaluateGenomes(members)
     
     #Create population with saved members
     population = Population(members, 0.0, 0.0, 0.0)
@@ -71,41 +115,39 @@ def InitializePopulation():
 def CreateLambdaPopulation(population):
     members = []
 
-    #Create a population of offspring from randomly selected parents
-    for i in range(LAMBDA_SIZE):
+    #randomly select both parents of every offspring
+    parentsOne, parentsTwo = ParentSelection(population)
+
+    #perform recombination on every pair of parents at once
+    representations = np.array([genome.representation for genome in population.members])
+    children = Recombination(representations, parentsOne, parentsTwo)
 
-        #randomly select parents
-        parents = ParentSelection(population)
-        
-        #perform recombination on parents
-        offspring = Genome(Recombination(parents[0], parents[1]), 0.0)
+    #Create a population of offspring from the recombined children
+    for rep in children.tolist():
+        offspring = Genome(rep, 0.0)
 
         #Use rng to decide whether or not offspring mutates
         if(random.uniform(0,100) > 100 * MUTATION_RATE):
             offspring = Mutation(offspring)
 
-        #Get fitness of offspring
-        offspring.fitness = HimmelblauFitness(offspring)
-
         members.append(offspring)
 
+    #Get fitness of every offspring at once
+    EvaluateGenomes(members)
+
     #create population from members
     lambdaPop = Population(members, 0.0, 0.0, 0.0)
 
     return AddPopulationStats(lambdaPop)
 
 
-def Recombination(parentOne, parentTwo):
-    child = []
+def Recombination(representations, parentsOne, parentsTwo):
 
     #Using discrete recombination with the hope that the genomes with the highest fitness will be those who had 2 good parents
     #Additionally this means that if a very good parent makes offspring with a very bad parent, there's no chance that the offspring is
     #as bad as the parent, as it cannot directly take the bad parent's attributes
-    for genotype in parentOne.representation:
-        index = parentOne.representation.index(genotype)
-        child.append((genotype + parentTwo.representation[index]) / 2.0)
-
-    return child
+    #Genes are paired by position, child i comes from parentsOne[i] and parentsTwo[i]
+    return Recombine(RECOMBINATION_METHOD, representations, parentsOne, parentsTwo, rng)
 
 def Mutation(genome):
     
@@ -114,77 +156,75 @@ def Mutation(genome):
 
     #For both x and y, there is a 50/50 chance that the mutation adds or subtracts from the variable
     #the number that is added/subtracted is randomly generated between 0 and the sigma value of the genome
-    if random.randint(1,2) == 1:
-        genome.representation[0] = genome.representation[0] + random.uniform(0, sigmaX)
+    coinFlips = stream.CoinFlips(2)
+    steps = stream.Uniforms(2)
+
+    if coinFlips[0]:
+        genome.representation[0] = genome.representation[0] + steps[0] * sigmaX
     else:
-        genome.representation[0] = genome.representation[0] - random.uniform(0, sigmaX)
+        genome.representation[0] = genome.representation[0] - steps[0] * sigmaX
     
-    if random.randint(1,2) == 2:
-        genome.representation[1] = genome.representation[1] + random.uniform(0, sigmaY)
+    if coinFlips[1]:
+        genome.representation[1] = genome.representation[1] + steps[1] * sigmaY
     else:
-        genome.representation[1] = genome.representation[1] - random.uniform(0, sigmaY)
+        genome.representation[1] = genome.representation[1] - steps[1] * sigmaY
 
     return genome
 
 def ParentSelection(muPopulation):
-    #randomly chooses two parents
-    parents = random.sample(muPopulation.members, 2)
-    
-    return parents
-
-def SurvivorSelection(lambdaPopulation):
-
-    survivors = []
-
-    #sort members from best to worst
-    lambdaPopulation.members.sort(key=getFitness)
+    #randomly chooses two different parents for every offspring, as index arrays into the members
+    return ParentPairs(len(muPopulation.members), LAMBDA_SIZE, rng)
 
-    #remove the 5 genomes with the lowest fitness to prevent them from surviving
-    for i in range(5):
-        lambdaPopulation.members.pop(len(lambdaPopulation.members)-1)
+def SurvivorSelection(muPopulation, lambdaPopulation):
 
-    #preserve the 5 genomes with the highest fitness to ensure we keep our current best genomes
-    survivors = lambdaPopulation.members[0:5]
+    key = "fitness"
+    strategy = SurvivorStrategy()
 
-    for i in range(10):
-        competitors = random.sample(lambdaPopulation.members, 9)
+    #With NICHING on, genomes are ranked on their niched cost among the genomes they compete with,
+    #so the population spreads over every minimum instead of collapsing onto one
+    if NICHING != "none":
+        Niche(CompetingGenomes(strategy, muPopulation.members, lambdaPopulation.members, MAX_AGE))
+        key = "niched"
 
-        for competitor in competitors:
-            lambdaPopulation.members.remove(competitor)
-        
-        #Add tournament winners to list of survivors
-        survivors.append(runTournament(competitors))
+    #SURVIVOR_STRATEGY picks the mu survivors, see Common/SurvivorStrategies.py
+    #Lower is better. The "hybrid" strategy keeps the 5 best offspring, drops the 5 worst and fills the rest with
+    #tournament winners, where the better genome of each match always wins
+    survivors = SelectSurvivors(strategy, muPopulation.members, lambdaPopulation.members, MU_SIZE, rng,
+                                maximize=False, rule="deterministic", maxAge=MAX_AGE, key=key)
 
     #create population from survivors
     lambdaPopulation = Population(survivors, 0.0, 0.0, 0.0)
     
     return AddPopulationStats(lambdaPopulation)
     
-def runTournament(competitors):
+#The survivor strategy a run uses
+#The "hybrid" strategy drops every parent, so a minimum whose niche holds no offspring in some generation is lost for
+#good, and with NICHING on the population ends up on one or two of the four. A niched run keeps its parents with
+#"plus" instead, unless SURVIVOR_STRATEGY asks for some other strategy
+def SurvivorStrategy():
+    if NICHING != "none" and SURVIVOR_STRATEGY == "hybrid":
+        return "plus"
 
-    #Run until there is one final winner
-    while len(competitors) > 1:
-        match = random.sample(competitors, 2)
+    return SURVIVOR_STRATEGY
 
-        competitors.remove(match[0])
-        competitors.remove(match[1])
+#Sets the niched cost of every genome, see Common/Niching.py
+def Niche(genomes):
+    points = np.array([genome.representation[:2] for genome in genomes])
+    cost = np.array([genome.fitness for genome in genomes])
 
-        #Adds winner of match back to the end of the array to be cycled back during next round
-        if(match[0].fitness < match[1].fitness):
-            competitors.append(match[0])
-        else:
-            competitors.append(match[1])
+    niched = NichedCosts(NICHING, points, cost, NICHE_RADIUS, SHARING_ALPHA, NICHE_CAPACITY, SHARING_MODE)
+    for genome, value in zip(genomes, niched.tolist()):
+        genome.niched = value
 
-    #Assign to winner variable as a prize for survival
-    winner = competitors[0]
-
-    return winner
+#Whether some member of the population is within OPTIMA_TOLERANCE of each of the four minima
+def OptimaCoverage(population):
+    points = np.array([genome.representation[:2] for genome in population.members])
 
+    return [bool(np.hypot(points[:, 0] - x, points[:, 1] - y).min() <= OPTIMA_TOLERANCE) for x, y in HIMMELBLAU_MINIMA]
 
 def AddPopulationStats(population):
     championFitness = population.members[0].fitness
     totalFitness = 0
-    maxDistance = 0.0
 
 
     for genome in population.members:
@@ -196,21 +236,26 @@ def AddPopulationStats(population):
         if genome.fitness < championFitness:
             championFitness = genome.fitness
 
-        members = population.members
-
-        #calculate distance between each member of the population and every other member
-        #could definitely be done faster but I can't remember how
-        for g in members:
-            distance = math.dist([genome.representation[0], genome.representation[1]], [g.representation[0], g.representation[1]])
-            if distance > maxDistance:
-                maxDistance = distance
-
     population.champion_fitness = championFitness
     population.average_fitness = totalFitness / len(population.members)
-    population.diversity = maxDistance
+
+    #diversity is the largest distance between any two members in x and y
+    points = np.array([genome.representation[:2] for genome in population.members])
+    population.diversity = PopulationDiameter(points)
 
     return population
 
+#Sets the fitness of every genome through the EVALUATOR backend, counting each evaluation
+def EvaluateGenomes(genomes):
+    global cumulative_evals
+
+    fitness = GetEvaluator(EVALUATOR, EVALUATION_WORKERS).Evaluate(HimmelblauFitness, genomes)
+    for genome, value in zip(genomes, fitness):
+        genome.fitness = value
+
+    cumulative_evals += len(genomes)
+    return genomes
+
 def HimmelblauFitness(genome):
     x = genome.representation[0]
     y = genome.representation[1]
@@ -221,19 +266,81 @@ def HimmelblauFitness(genome):
     return himmelblau 
 
 
-with open(FILE_STRING, "w") as os:
+#Wraps every row of CMA-ES samples in a genome so it is scored by the same fitness function as the ES
+#Sigma X and Sigma Y hold the search distribution's step size along x and y
+def SamplePopulation(samples, stepSizes):
+    members = []
+
+    for xy in samples.tolist():
+        members.append(Genome(xy + stepSizes.tolist(), 0.0))
+
+    EvaluateGenomes(members)
+
+    return AddPopulationStats(Population(members, 0.0, 0.0, 0.0))
+
+#Functions timed and counted when INSTRUMENT is set
+PHASES = {
+    "selection": ["ParentSelection", "SurvivorSelection"],
+    "variation": ["Recombination", "Mutation"],
+    "evaluation": ["HimmelblauFitness"],
+    "stats": ["AddPopulationStats"],
+}
+COUNTERS = {
+    "evals": ["HimmelblauFitness"],
+    "mutation_calls": ["Mutation"],
+}
+
+#Label that starts every line of this script's generation log
+def LogLabel():
+    if USE_CMAES:
+        return "Himmelblau CMA-ES {} {} {}".format(CMA_SIGMA, CMA_LAMBDA or DefaultLambda(2), 0.0)
+
+    label = "Himmelblau ES {} {} {}".format(MU_SIZE, LAMBDA_SIZE, 0.0)
+
+    #Approximate niche counts are part of what a run was, so they are named in its log
+    if NICHING == "sharing" and SHARING_MODE != "exact":
+        label += " sharing-" + SHARING_MODE
+
+    return label
+
+#One generation's statistics with a copy of its champion's representation, lower fitness is better
+def GenerationStatistics(generation, population):
+    champion = min(population.members, key=getFitness)
+
+    return GenerationStats(generation, cumulative_evals, population.champion_fitness, population.average_fitness, population.diversity, tuple(champion.representation))
+
+#CMA-ES in place of the self-adaptive ES, every generation is one lambda population of samples
+def EvolveCMAES():
+    global cumulative_evals
+    cumulative_evals = 0
+
+    #Search starts from a random point in the same range the ES draws x and y from
+    cma = CMAES(rng.uniform(-10.0, 10.0, 2), CMA_SIGMA, CMA_LAMBDA)
+
+    for generation in range(0, NUMBER_OF_GENERATIONS):
+        samples = cma.Ask(rng)
+        population = SamplePopulation(samples, cma.StepSizes())
+
+        #Himmelblau's function is already minimized
+        cma.Tell(samples, [genome.fitness for genome in population.members])
+
+        yield GenerationStatistics(generation, population)
+
+    return population
+
+#Runs the algorithm from a fresh population, yielding a GenerationStats for every generation
+#Nothing is written anywhere, and closing the generator stops the run
+def Evolve():
+    global cumulative_evals
+
+    if USE_CMAES:
+        return (yield from EvolveCMAES())
+
+    cumulative_evals = 0
+
     population = InitializePopulation()
-    cumulative_evals += 100
 
-    os.write("Himmelblau ES {} {} {} Generation {} {} {} {} {}\n".format(
-        MU_SIZE, 
-        LAMBDA_SIZE, 
-        0.0, 
-        0, 
-        cumulative_evals, 
-        population.champion_fitness,
-        population.average_fitness,
-        population.diversity ))
+    yield GenerationStatistics(0, population)
 
 
     for generation in range(1, NUMBER_OF_GENERATIONS):
@@ -241,18 +348,52 @@ with open(FILE_STRING, "w") as os:
         #create lambda population
         lambdaPopulation = CreateLambdaPopulation(population)
 
-        #create mu population from lambda population
-        muPopulation = SurvivorSelection(lambdaPopulation)
-        cumulative_evals += 100
+        #create mu population from the current population and lambda population, it parents the next generation
+        population = SurvivorSelection(population, lambdaPopulation)
+
+        yield GenerationStatistics(generation, population)
+
+    return population
+
+#Runs the algorithm, recording each generation to log
+def Run(log):
+    return RecordGenerations(log, Evolve())
+
+#Runs with clearing from NICHING_CHECK_SEED, without a log, and fails unless every minimum is found
+def CheckNiching():
+    global NICHING
+
+    NICHING = "clearing"
+    SeedScript(sys.modules[__name__], NICHING_CHECK_SEED)
+
+    coverage = OptimaCoverage(Run(MemoryLog()))
+    assert all(coverage), "Niching found {} of {} optima with seed {}".format(sum(coverage), len(coverage), NICHING_CHECK_SEED)
+
+    print("Niching check passed: {} of {} optima with seed {}".format(sum(coverage), len(coverage), NICHING_CHECK_SEED))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--check-niching", action="store_true", help="check a clearing run finds all four minima")
+    args = parser.parse_args()
+
+    if args.check_niching:
+        CheckNiching()
+        sys.exit()
+
+    #The instrumentation numbers are added to the text log's lines, a binary log has nowhere to put them
+    if INSTRUMENT and BINARY_LOG:
+        raise ValueError("INSTRUMENT needs a text log, turn BINARY_LOG off to instrument a run")
+
+    sequence = SeedScript(sys.modules[__name__], SEED)
+
+    with OpenLog(FILE_STRING, LogLabel(), BINARY_LOG, LOG_STRIDE, hasDiversity=True, seed=SeedRecord(sequence)) as log:
+        if INSTRUMENT:
+            log.file = MonitorScript(sys.modules[__name__], log.file)
 
-        os.write("Himmelblau ES {} {} {} Generation {} {} {} {} {}\n".format(
-        MU_SIZE, 
-        LAMBDA_SIZE, 
-        0.0, 
-        generation, 
-        cumulative_evals, 
-        muPopulation.champion_fitness,
-        muPopulation.average_fitness,
-        muPopulation.diversity ))
+        population = Run(log)
 
+    coverage = OptimaCoverage(population)
+    print("Optima found: {} of {}".format(sum(coverage), len(coverage)))
 
+    for (x, y), found in zip(HIMMELBLAU_MINIMA, coverage):
+        print("({}, {}) {}".format(x, y, "found" if found else "missed"))
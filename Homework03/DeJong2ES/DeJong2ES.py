@@ -1,22 +1,56 @@
+import argparse
 import random
 import math
 import json
 import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from Common.CMAES import CMAES, DefaultLambda
+from Common.Checkpoint import Checkpointer, RestoreRandomState
+from Common.Evaluation import GetEvaluator
+from Common.GenerationLog import GenerationStats, OpenLog, RecordGenerations
+from Common.Instrumentation import MonitorScript
+from Common.RandomStreams import RandomStream
+from Common.Recombination import ParentPairs, Recombine
+from Common.Seeding import SeedRecord, SeedScript
+from Common.SurvivorStrategies import SelectSurvivors
 
 N = 4
 LAMBDA_SIZE = 100
 MU_SIZE = 15
 MUTATION_RATE = 0.1
 NUMBER_OF_GENERATIONS = 1000000
+SEED = None
 PARENT_ONE_WEIGHT = 0.55
 PARENT_TWO_WEIGHT = 0.45
+RECOMBINATION_METHOD = "weighted"
+EVALUATOR = "serial"
+EVALUATION_WORKERS = None
+FITNESS_THRESHOLD = 300
+SURVIVOR_STRATEGY = "hybrid"
+MAX_AGE = 10
+USE_CMAES = False
+CMA_SIGMA = 2.5
+CMA_LAMBDA = None
+BINARY_LOG = False
+LOG_STRIDE = 1
+INSTRUMENT = False
+CHECKPOINT_INTERVAL = 10000
+CHECKPOINT_KEEP = 3
 
 cumulative_evals = 0
 
 FILE_STRING = "./OutputRW5545-10.txt"
+CHECKPOINT_DIRECTORY = "./CheckpointsRW5545-10"
 
 StatisticsDictionary = {}
 
+rng = np.random.default_rng()
+stream = RandomStream(rng)
+
 #Objects for Genome and Population
 class Genome:
     def __init__(self,
@@ -25,6 +59,9 @@ class Genome:
         self.representation = representation
         self.fitness = fitness
 
+        #Generations this genome has survived, used by the "age" survivor strategy
+        self.age = 0
+
 class Population:
     def __init__(self, 
                  members, 
@@ -50,10 +87,8 @@ def InitializeGenome():
     for i in range(0, N):
         rep.append(random.gauss(0, 1))
 
-    #Create genome and set its fitness
-    genome = Genome(rep, 0.0)
-    genome.fitness = DeJongFitness(genome)
-    return genome
+    #Create genome, its fitness is set along with the rest of the population
+    return Genome(rep, 0.0)
 
 def InitializePopulation():
     
@@ -62,6 +97,8 @@ def InitializePopulation():
     #Create members of population with size mu
     for i in range(MU_SIZE):
         members.append(InitializeGenome())
+
+    EvaluateGenomes(members)
     
     #Create population with saved members
     population = Population(members, 0.0, 0.0)
@@ -69,53 +106,65 @@ def InitializePopulation():
     #AddPopulationStats returns a population with the added statistics (Champion fitness, average fitness, and diversity)
     return AddPopulationStats(population)
 
+#Creates the lambda population from the current population and selects the next mu population from it
+def MakeNewGeneration(population):
+
+    #create lambda population
+    lambdaPopulation = CreateLambdaPopulation(population)
+
+    #create mu population from the current population and lambda population
+    return SurvivorSelection(population, lambdaPopulation)
+
 def CreateLambdaPopulation(population):
     members = []
 
-    #Create a population of offspring from randomly selected parents
-    for i in range(LAMBDA_SIZE):
+    #randomly select both parents of every offspring
+    parentsOne, parentsTwo = ParentSelection(population)
 
-        #randomly select parents
-        parents = ParentSelection(population)
-        
-        #perform recombination on parents
-        offspring = Genome(Recombination(parents[0], parents[1]), 0.0)
+    #perform recombination on every pair of parents at once
+    representations = np.array([genome.representation for genome in population.members])
+    children = Recombination(representations, parentsOne, parentsTwo)
+
+    #Create a population of offspring from the recombined children
+    for rep in children.tolist():
+        offspring = Genome(rep, 0.0)
 
         #Use rng to decide whether or not offspring mutates
         if(random.uniform(0,1) < MUTATION_RATE):
             offspring = Mutation(offspring)
 
-        #Get fitness of offspring
-        offspring.fitness = DeJongFitness(offspring)
         members.append(offspring)
 
+    #Get fitness of every offspring at once
+    EvaluateGenomes(members)
+
     #create population from members
     lambdaPop = Population(members, 0.0, 0.0)
 
     return AddPopulationStats(lambdaPop)
 
 
-def Recombination(parentOne, parentTwo):
-    child = []
+def Recombination(representations, parentsOne, parentsTwo):
 
     #Using discrete recombination with the hope that the genomes with the highest fitness will be those who had 2 good parents
     #Additionally this means that if a very good parent makes offspring with a very bad parent, there's no chance that the offspring is
     #as bad as the parent, as it cannot directly take the bad parent's attributes
-    for genotype in parentOne.representation:
-        index = parentOne.representation.index(genotype)
-        child.append(((PARENT_ONE_WEIGHT * genotype) + (PARENT_TWO_WEIGHT * parentTwo.representation[index])) / 2.0)
-
-    return child
+    #Genes are paired by position, child i comes from parentsOne[i] and parentsTwo[i]
+    #The weighted child is (PARENT_ONE_WEIGHT * first + PARENT_TWO_WEIGHT * second) / 2
+    return Recombine(RECOMBINATION_METHOD, representations, parentsOne, parentsTwo, rng, PARENT_ONE_WEIGHT / 2.0, PARENT_TWO_WEIGHT / 2.0)
 
 def Mutation(genome):
     
 
     #For both x and y, there is a 50/50 chance that the mutation adds or subtracts from the variable
     #the number that is added/subtracted is randomly generated between 0 and the sigma value of the genome
+    steps = stream.Uniforms(N)
+    coinFlips = stream.CoinFlips(N)
+
     for i in range(0, N):
         sigma = genome.representation[i + N]
-        random_uniform = random.uniform(0, abs(sigma))
-        if (random.randint(1,2) == 1 and genome.representation[i] + random_uniform <= 5.12) or genome.representation[i] - random_uniform >= -5.11:
+        random_uniform = steps[i] * abs(sigma)
+        if (coinFlips[i] and genome.representation[i] + random_uniform <= 5.12) or genome.representation[i] - random_uniform >= -5.11:
             genome.representation[i] = genome.representation[i] + random_uniform
         else:
             genome.representation[i] = genome.representation[i] - random_uniform
@@ -123,60 +172,22 @@ def Mutation(genome):
     return genome
 
 def ParentSelection(muPopulation):
-    #randomly chooses two parents
-    parents = random.sample(muPopulation.members, 2)
-    
-    return parents
-
-def SurvivorSelection(lambdaPopulation):
-
-    survivors = []
-
-    #sort members from best to worst
-    lambdaPopulation.members.sort(key=getFitness)
+    #randomly chooses two different parents for every offspring, as index arrays into the members
+    return ParentPairs(len(muPopulation.members), LAMBDA_SIZE, rng)
 
-    #remove the 5 genomes with the lowest fitness to prevent them from surviving
-    lambdaPopulation.members = lambdaPopulation.members[5:]
+def SurvivorSelection(muPopulation, lambdaPopulation):
 
-    #preserve the 5 genomes with the highest fitness to ensure we keep our current best genomes
-    survivors = lambdaPopulation.members[len(lambdaPopulation.members)-5:]
-
-    for i in range(10):
-        competitors = random.sample(lambdaPopulation.members, 9) if len(lambdaPopulation.members) > 9 else lambdaPopulation.members
-        
-        for competitor in competitors:
-            lambdaPopulation.members.remove(competitor)
-
-        #Add tournament winners to list of survivors
-        survivors.append(runTournament(competitors))
+    #SURVIVOR_STRATEGY picks the mu survivors, see Common/SurvivorStrategies.py
+    #The "hybrid" strategy keeps the 5 fittest offspring, drops the 5 least fit and fills the rest with tournament winners,
+    #where the fitter genome of each match wins 80% of the time
+    survivors = SelectSurvivors(SURVIVOR_STRATEGY, muPopulation.members, lambdaPopulation.members, MU_SIZE, rng,
+                                rule="fixed", upsetChance=0.2, maxAge=MAX_AGE)
 
     #create population from survivors
     lambdaPopulation = Population(survivors, 0.0, 0.0)
     
     return AddPopulationStats(lambdaPopulation)
     
-def runTournament(competitors):
-
-    #Run until there is one final winner
-    while len(competitors) > 1:
-        match = random.sample(competitors, 2)
-
-        competitors.remove(match[0])
-        competitors.remove(match[1])
-
-        #Adds winner of match back to the end of the array to be cycled back during next round
-        if(match[0].fitness > match[1].fitness):
-
-            competitors.append(match[0] if random.uniform(0, 1) > 0.2 else match[1])
-        else:
-            competitors.append(match[1] if random.uniform(0, 1) > 0.2 else match[0])
-
-    #Assign to winner variable as a prize for survival
-    winner = competitors[0]
-
-    return winner
-
-
 def AddPopulationStats(population):
     championFitness = population.members[0].fitness
     totalFitness = 0
@@ -197,6 +208,17 @@ def AddPopulationStats(population):
     return population
 
 
+#Sets the fitness of every genome through the EVALUATOR backend, counting each evaluation
+def EvaluateGenomes(genomes):
+    global cumulative_evals
+
+    fitness = GetEvaluator(EVALUATOR, EVALUATION_WORKERS).Evaluate(DeJongFitness, genomes)
+    for genome, value in zip(genomes, fitness):
+        genome.fitness = value
+
+    cumulative_evals += len(genomes)
+    return genomes
+
 def DeJongFitness(genome):
     dejong = 1
     rep = genome.representation
@@ -206,41 +228,149 @@ def DeJongFitness(genome):
     return 1000 / dejong 
 
 
-with open(FILE_STRING, "w") as os:
-    population = InitializePopulation()
-    cumulative_evals += 100
+#Wraps every row of CMA-ES samples in a genome so it is scored by the same fitness function as the ES
+#The sigma half of each representation holds the search distribution's step size for that x value
+def SamplePopulation(samples, stepSizes):
+    members = []
 
-    os.write("DeJong Test Suite 2 ES {} {} {} Generation {} {} {} {}\n".format(
-        MU_SIZE, 
-        LAMBDA_SIZE, 
-        0.0, 
-        0, 
-        cumulative_evals, 
-        population.champion_fitness,
-        population.average_fitness))
+    for x in samples.tolist():
+        members.append(Genome(x + stepSizes.tolist(), 0.0))
 
+    EvaluateGenomes(members)
 
-    for generation in range(1, NUMBER_OF_GENERATIONS):
+    return AddPopulationStats(Population(members, 0.0, 0.0))
 
-        #create lambda population
-        lambdaPopulation = CreateLambdaPopulation(population)
+#Population arrays saved in a checkpoint
+def CheckpointArrays(population):
+    return {
+        "representations": np.array([genome.representation for genome in population.members]),
+        "fitness": np.array([genome.fitness for genome in population.members]),
+        "ages": np.array([genome.age for genome in population.members]),
+        "cumulative_evals": cumulative_evals,
+    }
 
-        #create mu population from lambda population
-        population = SurvivorSelection(lambdaPopulation)
-        cumulative_evals += 100
+#Rebuilds the population and counters from a checkpoint and returns it with the next generation to run
+def RestoreCheckpoint(snapshot):
+    global cumulative_evals
 
-        os.write("DeJong Test Suite 2 ES {} {} {} Generation {} {} {} {}\n".format(
-        MU_SIZE, 
-        LAMBDA_SIZE, 
-        0.0, 
-        generation, 
-        cumulative_evals, 
-        population.champion_fitness,
-        population.average_fitness))
+    members = []
+    for rep, fitness, age in zip(snapshot["representations"].tolist(), snapshot["fitness"].tolist(), snapshot["ages"].tolist()):
+        genome = Genome(rep, fitness)
+        genome.age = age
+        members.append(genome)
+
+    cumulative_evals = int(snapshot["cumulative_evals"])
+    RestoreRandomState(snapshot, rng, stream)
+
+    return AddPopulationStats(Population(members, 0.0, 0.0)), int(snapshot["generation"]) + 1
+
+#Functions timed and counted when INSTRUMENT is set
+PHASES = {
+    "selection": ["ParentSelection", "SurvivorSelection"],
+    "variation": ["Recombination", "Mutation"],
+    "evaluation": ["DeJongFitness"],
+    "stats": ["AddPopulationStats"],
+}
+COUNTERS = {
+    "evals": ["DeJongFitness"],
+    "mutation_calls": ["Mutation"],
+}
+
+#Label that starts every line of this script's generation log
+def LogLabel():
+    if USE_CMAES:
+        return "DeJong Test Suite 2 CMA-ES {} {} {}".format(CMA_SIGMA, CMA_LAMBDA or DefaultLambda(N), 0.0)
+
+    return "DeJong Test Suite 2 ES {} {} {}".format(MU_SIZE, LAMBDA_SIZE, 0.0)
+
+#One generation's statistics with a copy of its champion's representation
+def GenerationStatistics(generation, population):
+    champion = max(population.members, key=getFitness)
+
+    return GenerationStats(generation, cumulative_evals, population.champion_fitness, population.average_fitness, 0.0, tuple(champion.representation))
+
+#CMA-ES in place of the self-adaptive ES, every generation is one lambda population of samples
+def EvolveCMAES():
+    global cumulative_evals
+    cumulative_evals = 0
+
+    #Search starts from a random point in the same range the ES draws its x values from
+    cma = CMAES(rng.uniform(-5.12, 5.11, N), CMA_SIGMA, CMA_LAMBDA)
+
+    for generation in range(0, NUMBER_OF_GENERATIONS):
+        samples = cma.Ask(rng)
+        population = SamplePopulation(samples, cma.StepSizes())
+
+        #CMA-ES minimizes, so it is told the negated fitness
+        cma.Tell(samples, [-genome.fitness for genome in population.members])
+
+        yield GenerationStatistics(generation, population)
+
+        if population.average_fitness > FITNESS_THRESHOLD:
+            print("THRESHOLD MET - Generation " + str(generation))
+            break
+
+    return population
+
+#Runs the algorithm from a fresh population, or from snapshot when resuming, yielding a GenerationStats for every generation
+#Nothing is written anywhere, and closing the generator stops the run
+#checkpoints saves a snapshot every CHECKPOINT_INTERVAL generations, along with how far log has been written,
+#the CMA-ES mode is not checkpointed
+def Evolve(checkpoints=None, snapshot=None, log=None):
+    global cumulative_evals
+
+    if USE_CMAES:
+        return (yield from EvolveCMAES())
+
+    if snapshot is None:
+        cumulative_evals = 0
+
+        population = InitializePopulation()
+
+        yield GenerationStatistics(0, population)
+        start = 1
+    else:
+        population, start = RestoreCheckpoint(snapshot)
+
+
+    for generation in range(start, NUMBER_OF_GENERATIONS):
+        population = MakeNewGeneration(population)
+
+        yield GenerationStatistics(generation, population)
 
         
-        if population.average_fitness > 300:
+        if population.average_fitness > FITNESS_THRESHOLD:
             print("THRESHOLD MET - Generation " + str(generation))
             break
 
+        if checkpoints is not None and checkpoints.Due(generation):
+            checkpoints.Save(generation, CheckpointArrays(population), rng, log, stream)
+
+    return population
+
+#Runs the algorithm, recording each generation to log
+def Run(log, checkpoints=None, snapshot=None):
+    return RecordGenerations(log, Evolve(checkpoints, snapshot, log))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", action="store_true", help="continue from the newest checkpoint")
+    args = parser.parse_args()
+
+    checkpoints = Checkpointer(CHECKPOINT_DIRECTORY, "DeJong2ES", CHECKPOINT_INTERVAL, CHECKPOINT_KEEP)
+    snapshot = checkpoints.Latest() if args.resume else None
+
+    if snapshot is not None:
+        print("Resuming after generation " + str(int(snapshot["generation"])))
+
+    #The instrumentation numbers are added to the text log's lines, a binary log has nowhere to put them
+    if INSTRUMENT and BINARY_LOG:
+        raise ValueError("INSTRUMENT needs a text log, turn BINARY_LOG off to instrument a run")
+
+    sequence = SeedScript(sys.modules[__name__], SEED)
+
+    with OpenLog(FILE_STRING, LogLabel(), BINARY_LOG, LOG_STRIDE, offset=None if snapshot is None else int(snapshot["log_offset"]), seed=SeedRecord(sequence)) as log:
+        if INSTRUMENT:
+            log.file = MonitorScript(sys.modules[__name__], log.file)
 
+        Run(log, checkpoints, snapshot)
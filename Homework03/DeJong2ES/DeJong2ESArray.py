@@ -0,0 +1,201 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from Common.GenerationLog import GenerationStats, OpenLog, RecordGenerations
+from Common.Recombination import ParentPairs, Recombine
+from Common.Seeding import SeedRecord, SeedScript
+from Common.Tournament import RunTournaments
+
+N = 4
+LAMBDA_SIZE = 100
+MU_SIZE = 15
+MUTATION_RATE = 0.1
+NUMBER_OF_GENERATIONS = 1000000
+SEED = None
+PARENT_ONE_WEIGHT = 0.55
+PARENT_TWO_WEIGHT = 0.45
+RECOMBINATION_METHOD = "weighted"
+FITNESS_THRESHOLD = 300
+BINARY_LOG = False
+LOG_STRIDE = 1
+
+cumulative_evals = 0
+
+FILE_STRING = "./OutputArrayRW5545-10.txt"
+
+rng = np.random.default_rng()
+
+#Array-backed version of DeJong2ES.py for any number of genes
+#Each population is one (size, 2N) float64 matrix: columns [0, N) hold the x values and
+#columns [N, 2N) hold the matching self-adaptive sigmas. Every operator works on slices of the
+#gene axis for the whole population at once, so N is only limited by memory.
+#
+#Memory per genome is 16N bytes of representation plus 8 bytes of fitness,
+#about 160 KB per genome and 16 MB for the lambda population at N = 10,000.
+class Population:
+    def __init__(self,
+                 representations,
+                 fitness,
+                 champion_fitness,
+                 average_fitness):
+        self.representations = representations
+        self.fitness = fitness
+        self.champion_fitness = champion_fitness
+        self.average_fitness = average_fitness
+
+def BytesPerGenome():
+    return (2 * N + 1) * np.dtype(np.float64).itemsize
+
+def InitializePopulation():
+
+    representations = np.empty((MU_SIZE, 2 * N))
+
+    #Each x value is a random float between -5.12 and 5.11
+    representations[:, :N] = rng.uniform(-5.12, 5.11, (MU_SIZE, N))
+
+    #Each sigma is a random Gaussian value with a mean of 0 and a standard deviation of one
+    representations[:, N:] = rng.normal(0, 1, (MU_SIZE, N))
+
+    #Create population and set the fitness of every member
+    population = Population(representations, DeJongFitness(representations), 0.0, 0.0)
+
+    #AddPopulationStats returns a population with the added statistics (Champion fitness and average fitness)
+    return AddPopulationStats(population)
+
+#Creates the lambda population from the current population and selects the next mu population from it
+def MakeNewGeneration(population):
+
+    #create lambda population
+    lambdaPopulation = CreateLambdaPopulation(population)
+
+    #create mu population from lambda population
+    return SurvivorSelection(lambdaPopulation)
+
+def CreateLambdaPopulation(population):
+
+    #randomly select two different parents for every offspring
+    parentsOne, parentsTwo = ParentPairs(len(population.fitness), LAMBDA_SIZE, rng)
+
+    #perform recombination on every pair of parents at once
+    offspring = Recombination(population.representations, parentsOne, parentsTwo)
+
+    #Use rng to decide whether or not each offspring mutates
+    mutating = rng.random(LAMBDA_SIZE) < MUTATION_RATE
+    offspring[mutating] = Mutation(offspring[mutating])
+
+    #create population from offspring and get their fitness
+    lambdaPop = Population(offspring, DeJongFitness(offspring), 0.0, 0.0)
+
+    return AddPopulationStats(lambdaPop)
+
+#Recombination gene by gene, for every child at once
+#The weighted child is (PARENT_ONE_WEIGHT * first + PARENT_TWO_WEIGHT * second) / 2 like DeJong2ES.py
+def Recombination(representations, parentsOne, parentsTwo):
+    return Recombine(RECOMBINATION_METHOD, representations, parentsOne, parentsTwo, rng, PARENT_ONE_WEIGHT / 2.0, PARENT_TWO_WEIGHT / 2.0)
+
+def Mutation(representations):
+    x = representations[:, :N]
+    sigma = representations[:, N:]
+
+    #Each x value moves by a random amount between 0 and its sigma
+    #It moves up on a coin flip if that stays under 5.12, or whenever moving down would go under -5.11
+    step = rng.random(x.shape) * np.abs(sigma)
+    coinFlip = rng.random(x.shape) < 0.5
+    up = (coinFlip & (x + step <= 5.12)) | (x - step >= -5.11)
+
+    representations[:, :N] = np.where(up, x + step, x - step)
+
+    return representations
+
+def SurvivorSelection(lambdaPopulation):
+
+    fitness = lambdaPopulation.fitness
+
+    #Partition the indices so the 5 lowest fitnesses come first and the 5 highest come last, without sorting the rest
+    order = np.argpartition(fitness, (4, len(fitness) - 5))
+
+    #remove the 5 genomes with the lowest fitness to prevent them from surviving
+    remaining = order[5:]
+
+    #Shuffle the remaining indices once and split them into 10 groups of 9, so no genome is in two tournaments
+    groups = rng.permutation(remaining)[:90].reshape(10, 9)
+
+    #preserve the 5 genomes with the highest fitness to ensure we keep our current best genomes
+    #Add tournament winners to the survivors, every tournament is played at once
+    #The fitter genome of each match wins 80% of the time
+    survivors = np.concatenate((order[-5:], RunTournaments(groups, fitness, "fixed", rng, upsetChance=0.2)))
+
+    #create population from survivors
+    population = Population(lambdaPopulation.representations[survivors], lambdaPopulation.fitness[survivors], 0.0, 0.0)
+
+    return AddPopulationStats(population)
+
+def AddPopulationStats(population):
+    population.champion_fitness = float(population.fitness.max())
+    population.average_fitness = float(population.fitness.mean())
+
+    return population
+
+def DeJongFitness(representations):
+    global cumulative_evals
+    cumulative_evals += len(representations)
+
+    #Rosenbrock sum over the x values of each row
+    x = representations[:, :N - 1]
+    xNext = representations[:, 1:N]
+    dejong = 1 + np.sum(100 * ((xNext - (x ** 2)) ** 2) + ((x - 1) ** 2), axis=1)
+
+    return 1000 / dejong
+
+
+#Label that starts every line of this script's generation log
+def LogLabel():
+    return "DeJong Test Suite 2 ES {} {} {}".format(MU_SIZE, LAMBDA_SIZE, 0.0)
+
+#One generation's statistics with a copy of its champion's row
+def GenerationStatistics(generation, population):
+    champion = population.representations[int(population.fitness.argmax())]
+
+    return GenerationStats(generation, cumulative_evals, population.champion_fitness, population.average_fitness, 0.0, tuple(champion.tolist()))
+
+#Runs the algorithm from a fresh population, yielding a GenerationStats for every generation
+#Nothing is written anywhere, and closing the generator stops the run
+def Evolve():
+    global cumulative_evals
+    cumulative_evals = 0
+
+    population = InitializePopulation()
+
+    yield GenerationStatistics(0, population)
+
+
+    for generation in range(1, NUMBER_OF_GENERATIONS):
+        population = MakeNewGeneration(population)
+
+        yield GenerationStatistics(generation, population)
+
+        if population.average_fitness > FITNESS_THRESHOLD:
+            print("THRESHOLD MET - Generation " + str(generation))
+            break
+
+    return population
+
+#Runs the algorithm, recording each generation to log
+def Run(log):
+    return RecordGenerations(log, Evolve())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--genes", type=int, default=N, help="number of genes N")
+    N = parser.parse_args().genes
+
+    print("N = {}, {} bytes per genome".format(N, BytesPerGenome()))
+
+    sequence = SeedScript(sys.modules[__name__], SEED)
+
+    with OpenLog(FILE_STRING, LogLabel(), BINARY_LOG, LOG_STRIDE, seed=SeedRecord(sequence)) as log:
+        Run(log)
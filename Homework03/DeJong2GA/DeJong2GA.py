@@ -1,20 +1,44 @@
+import argparse
 import random
 import math
 import json
 import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from Common.Checkpoint import Checkpointer, RestoreRandomState
+from Common.GenerationLog import GenerationStats, OpenLog, RecordGenerations
+from Common.Instrumentation import MonitorScript
+from Common.RandomStreams import RandomStream
+from Common.RouletteWheel import RouletteWheel
+from Common.Seeding import SeedRecord, SeedScript
 
 N = 4
 POPULATION_SIZE = 100
 MUTATION_RATE = 0.8
 CROSSOVER_RATE = 0.1
 NUMBER_OF_GENERATIONS = 1000000
+SEED = None
+SELECTION_METHOD = "cumulative"
+FITNESS_THRESHOLD = 300
+BINARY_LOG = False
+LOG_STRIDE = 1
+INSTRUMENT = False
+CHECKPOINT_INTERVAL = 10000
+CHECKPOINT_KEEP = 3
 
 cumulative_evals = 0
 
 FILE_STRING = "./OutputMR08-10.txt"
+CHECKPOINT_DIRECTORY = "./CheckpointsMR08-10"
 
 StatisticsDictionary = {}
 
+rng = np.random.default_rng()
+stream = RandomStream(rng)
+
 #Objects for Genome and Population
 class Genome:
     def __init__(self,
@@ -23,6 +47,9 @@ class Genome:
         self.representation = representation
         self.fitness = fitness
 
+        #Set whenever the representation changes, cleared once the new fitness has been computed
+        self.changed = True
+
 class Population:
     def __init__(self, 
                  members, 
@@ -42,8 +69,7 @@ def InitializeGenome():
 
     #Create genome and set its fitness
     genome = Genome(rep, 0.0)
-    genome.fitness = DeJongFitness(genome)
-    return genome
+    return EvaluateGenome(genome)
 
 def InitializePopulation():
     
@@ -66,47 +92,66 @@ def Crossover(parentOne, parentTwo):
     crossover_point = random.randint(0, N)
     
     childOne = Genome(parentOne.representation[:crossover_point] + parentTwo.representation[crossover_point:], 0.0)
-    childOne.fitness = DeJongFitness(childOne)
-
     childTwo = Genome(parentTwo.representation[:crossover_point] + parentOne.representation[crossover_point:], 0.0)
-    childTwo.fitness = DeJongFitness(childTwo)
+
+    #A crossover point at either end only copies the parents, so the children keep their parent's fitness
+    if crossover_point == 0:
+        InheritFitness(childOne, parentTwo)
+        InheritFitness(childTwo, parentOne)
+    elif crossover_point == len(parentOne.representation):
+        InheritFitness(childOne, parentOne)
+        InheritFitness(childTwo, parentTwo)
 
     return [childOne, childTwo]
 
+def InheritFitness(child, parent):
+    child.fitness = parent.fitness
+    child.changed = parent.changed
+
 def Mutation(genome):
 
-    for i in range(0, len(genome.representation)):
-        if random.uniform(0, 1) < MUTATION_RATE:
-            genome.representation[i] = random.uniform(-5.12, 5.11)
+    #Two pre-drawn uniforms for every gene, the first decides whether it mutates and the second is
+    #scaled to a replacement between -5.12 and 5.11 like random.uniform(-5.12, 5.11)
+    count = len(genome.representation)
+    draws = stream.Uniforms(2 * count)
+
+    for i in range(0, count):
+        if draws[i] < MUTATION_RATE:
+            genome.representation[i] = -5.12 + (5.11 + 5.12) * draws[count + i]
+            genome.changed = True
     
     return genome
 
 
+#Returns the indices of every parent for this generation, consecutive pairs are mated
+def ParentSelection(population):
+
+    #Build the roulette wheel once and draw every parent for this generation in one batch
+    wheel = RouletteWheel([genome.fitness for genome in population.members], SELECTION_METHOD)
+
+    return wheel.Draw(2 * (POPULATION_SIZE // 2), rng)
+
 def MakeNewGeneration(population):
 
     newChildren = []
-    parents = []
 
-    totalFitness = sum(genome.fitness for genome in population.members)
+    selected = ParentSelection(population)
+
+    for i in range(0, len(selected), 2):
+        parents = [population.members[selected[i]], population.members[selected[i + 1]]]
 
-    for i in range(0, POPULATION_SIZE):
-        selectionChance = random.uniform(0, totalFitness)
+        parents[0] = Mutation(parents[0])
+        parents[1] = Mutation(parents[1])
 
-        currentFitness = 0
-        for genome in population.members:
-            currentFitness += genome.fitness
-            if currentFitness > selectionChance:
-                parents.append(genome)
-                break
-        if len(parents) == 2:
-            parents[0] = Mutation(parents[0])
-            parents[1] = Mutation(parents[1])
+        if random.uniform(0,1) < CROSSOVER_RATE:
+            newChildren += Crossover(parents[0], parents[1])
+        else:
+            newChildren += parents
 
-            if random.uniform(0,1) < CROSSOVER_RATE:
-                newChildren += Crossover(parents[0], parents[1])
-            else:
-                newChildren += parents
-            parents = []
+    #Only genomes that changed since their last evaluation are evaluated again
+    #A genome drawn more than once is the same object, so it is still evaluated only once
+    for genome in newChildren:
+        EvaluateGenome(genome)
 
     #create population from survivors
     newPopulation = Population(newChildren, 0.0, 0.0)
@@ -133,6 +178,17 @@ def AddPopulationStats(population):
 
     return population
 
+#Recomputes fitness only when the representation changed, counting every real evaluation
+def EvaluateGenome(genome):
+    global cumulative_evals
+
+    if genome.changed:
+        genome.fitness = DeJongFitness(genome)
+        genome.changed = False
+        cumulative_evals += 1
+
+    return genome
+
 def DeJongFitness(genome):
     dejong = 1
     rep = genome.representation
@@ -141,34 +197,116 @@ def DeJongFitness(genome):
 
     return 1000 / dejong 
 
-with open(FILE_STRING, "w") as os:
-    population = InitializePopulation()
-    cumulative_evals += POPULATION_SIZE
+#Population arrays saved in a checkpoint
+#A genome drawn twice is one shared object, so aliases[i] is the first index holding the same genome as member i
+def CheckpointArrays(population):
+    members = population.members
+    firstIndex = {}
+
+    return {
+        "representations": np.array([genome.representation for genome in members]),
+        "fitness": np.array([genome.fitness for genome in members]),
+        "changed": np.array([genome.changed for genome in members]),
+        "aliases": np.array([firstIndex.setdefault(id(genome), i) for i, genome in enumerate(members)]),
+        "cumulative_evals": cumulative_evals,
+    }
+
+#Rebuilds the population and counters from a checkpoint and returns it with the next generation to run
+def RestoreCheckpoint(snapshot):
+    global cumulative_evals
+
+    members = []
+    for i, alias in enumerate(snapshot["aliases"].tolist()):
+        if alias != i:
+            members.append(members[alias])
+            continue
+
+        genome = Genome(snapshot["representations"][i].tolist(), float(snapshot["fitness"][i]))
+        genome.changed = bool(snapshot["changed"][i])
+        members.append(genome)
+
+    cumulative_evals = int(snapshot["cumulative_evals"])
+    RestoreRandomState(snapshot, rng, stream)
+
+    return AddPopulationStats(Population(members, 0.0, 0.0)), int(snapshot["generation"]) + 1
+
+#Functions timed and counted when INSTRUMENT is set
+PHASES = {
+    "selection": ["ParentSelection"],
+    "variation": ["Mutation", "Crossover"],
+    "evaluation": ["DeJongFitness"],
+    "stats": ["AddPopulationStats"],
+}
+COUNTERS = {
+    "evals": ["DeJongFitness"],
+    "mutation_calls": ["Mutation"],
+}
+
+#Label that starts every line of this script's generation log
+def LogLabel():
+    return "DeJong Test Suite 2 GA {} {}".format(POPULATION_SIZE, 0.0)
+
+#One generation's statistics with a copy of its champion's representation
+def GenerationStatistics(generation, population):
+    champion = max(population.members, key=lambda g: g.fitness)
+
+    return GenerationStats(generation, cumulative_evals, population.champion_fitness, population.average_fitness, 0.0, tuple(champion.representation))
+
+#Runs the algorithm from a fresh population, or from snapshot when resuming, yielding a GenerationStats for every generation
+#Nothing is written anywhere, and closing the generator stops the run
+#checkpoints saves a snapshot every CHECKPOINT_INTERVAL generations, along with how far log has been written
+def Evolve(checkpoints=None, snapshot=None, log=None):
+    global cumulative_evals
+
+    if snapshot is None:
+        cumulative_evals = 0
 
-    os.write("DeJong Test Suite 2 GA {} {} Generation {} {} {} {}\n".format(
-        POPULATION_SIZE, 
-        0.0, 
-        0, 
-        cumulative_evals, 
-        population.champion_fitness,
-        population.average_fitness))
+        population = InitializePopulation()
 
+        yield GenerationStatistics(0, population)
+        start = 1
+    else:
+        population, start = RestoreCheckpoint(snapshot)
 
-    for generation in range(1, NUMBER_OF_GENERATIONS):
+
+    for generation in range(start, NUMBER_OF_GENERATIONS):
         #create lambda population
         population = MakeNewGeneration(population)
-        cumulative_evals += POPULATION_SIZE
 
-        os.write("DeJong Test Suite 2 GA {} {} Generation {} {} {} {}\n".format(
-        POPULATION_SIZE,
-        0.0, 
-        generation, 
-        cumulative_evals, 
-        population.champion_fitness,
-        population.average_fitness))
+        yield GenerationStatistics(generation, population)
 
-        if population.average_fitness > 300:
+        if population.average_fitness > FITNESS_THRESHOLD:
             print("THRESHOLD MET - Generation " + str(generation))
             break
 
+        if checkpoints is not None and checkpoints.Due(generation):
+            checkpoints.Save(generation, CheckpointArrays(population), rng, log, stream)
+
+    return population
+
+#Runs the algorithm, recording each generation to log
+def Run(log, checkpoints=None, snapshot=None):
+    return RecordGenerations(log, Evolve(checkpoints, snapshot, log))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", action="store_true", help="continue from the newest checkpoint")
+    args = parser.parse_args()
+
+    checkpoints = Checkpointer(CHECKPOINT_DIRECTORY, "DeJong2GA", CHECKPOINT_INTERVAL, CHECKPOINT_KEEP)
+    snapshot = checkpoints.Latest() if args.resume else None
+
+    if snapshot is not None:
+        print("Resuming after generation " + str(int(snapshot["generation"])))
+
+    #The instrumentation numbers are added to the text log's lines, a binary log has nowhere to put them
+    if INSTRUMENT and BINARY_LOG:
+        raise ValueError("INSTRUMENT needs a text log, turn BINARY_LOG off to instrument a run")
+
+    sequence = SeedScript(sys.modules[__name__], SEED)
+
+    with OpenLog(FILE_STRING, LogLabel(), BINARY_LOG, LOG_STRIDE, offset=None if snapshot is None else int(snapshot["log_offset"]), seed=SeedRecord(sequence)) as log:
+        if INSTRUMENT:
+            log.file = MonitorScript(sys.modules[__name__], log.file)
 
+        Run(log, checkpoints, snapshot)
@@ -0,0 +1,202 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from Common.GenerationLog import GenerationStats, OpenLog, RecordGenerations
+from Common.RouletteWheel import RouletteWheel
+from Common.Seeding import SeedRecord, SeedScript
+
+N = 4
+POPULATION_SIZE = 100
+MUTATION_RATE = 0.8
+CROSSOVER_RATE = 0.1
+NUMBER_OF_GENERATIONS = 1000000
+SEED = None
+SELECTION_METHOD = "cumulative"
+FITNESS_THRESHOLD = 300
+BINARY_LOG = False
+LOG_STRIDE = 1
+
+cumulative_evals = 0
+
+FILE_STRING = "./OutputArrayMR08-10.txt"
+
+rng = np.random.default_rng()
+
+#Array-backed version of DeJong2GA.py
+#The population is one (POPULATION_SIZE, N) float64 matrix and a fitness vector, so every
+#operator works on the whole population at once instead of looping over Genome objects.
+#N can be set with --genes and is only limited by memory.
+#
+#Memory per genome is 8N bytes of representation plus 8 bytes of fitness,
+#about 80 KB per genome and 8 MB for the whole population at N = 10,000.
+class Population:
+    def __init__(self,
+                 representations,
+                 fitness,
+                 champion_fitness,
+                 average_fitness):
+        self.representations = representations
+        self.fitness = fitness
+        self.champion_fitness = champion_fitness
+        self.average_fitness = average_fitness
+
+def BytesPerGenome():
+    return (N + 1) * np.dtype(np.float64).itemsize
+
+def InitializePopulation():
+
+    #Each x value is a random float between -5.12 and 5.11
+    representations = rng.uniform(-5.12, 5.11, (POPULATION_SIZE, N))
+
+    #Create population and set the fitness of every member
+    population = Population(representations, EvaluateChanged(representations, None, None), 0.0, 0.0)
+
+    #AddPopulationStats returns a population with the added statistics (Champion fitness and average fitness)
+    return AddPopulationStats(population)
+
+def Crossover(parentsOne, parentsTwo):
+
+    #One crossover point per pair of parents, drawn from 0 to N like the list version
+    crossoverPoints = rng.integers(0, N + 1, len(parentsOne))
+
+    #Genes at or after the crossover point come from the other parent
+    swap = np.arange(N) >= crossoverPoints[:, None]
+
+    childrenOne = np.where(swap, parentsTwo, parentsOne)
+    childrenTwo = np.where(swap, parentsOne, parentsTwo)
+
+    return childrenOne, childrenTwo, crossoverPoints
+
+def Mutation(representations):
+
+    #Each gene is replaced by a new random value when its coin flip lands under the mutation rate
+    mask = rng.random(representations.shape) < MUTATION_RATE
+    representations[mask] = rng.uniform(-5.12, 5.11, np.count_nonzero(mask))
+
+    #Rows with at least one new gene need their fitness recomputed
+    return representations, mask.any(axis=1)
+
+
+def MakeNewGeneration(population):
+
+    pairs = POPULATION_SIZE // 2
+
+    #Build the roulette wheel once and draw every parent for this generation in one batch
+    selected = RouletteWheel(population.fitness, SELECTION_METHOD).Draw(2 * pairs, rng)
+
+    #Fancy indexing copies the parents, so mutation never touches the old population
+    #Parents keep their old fitness until something marks them as changed
+    parents, changed = Mutation(population.representations[selected])
+    fitness = population.fitness[selected]
+
+    parentsOne = parents[0::2]
+    parentsTwo = parents[1::2]
+    fitnessOne = fitness[0::2]
+    fitnessTwo = fitness[1::2]
+    changedOne = changed[0::2]
+    changedTwo = changed[1::2]
+
+    #Pairs that cross over are replaced by their children, the rest carry on as mutated parents
+    crossed = np.flatnonzero(rng.random(pairs) < CROSSOVER_RATE)
+    childrenOne, childrenTwo, crossoverPoints = Crossover(parentsOne[crossed], parentsTwo[crossed])
+    parentsOne[crossed] = childrenOne
+    parentsTwo[crossed] = childrenTwo
+
+    #A crossover point of 0 swaps the two parents whole, so their fitness swaps with them
+    swapped = crossed[crossoverPoints == 0]
+    fitnessOne[swapped], fitnessTwo[swapped] = fitnessTwo[swapped], fitnessOne[swapped]
+    changedOne[swapped], changedTwo[swapped] = changedTwo[swapped], changedOne[swapped]
+
+    #Any point strictly inside the genome makes two new genomes
+    mixed = crossed[(crossoverPoints > 0) & (crossoverPoints < N)]
+    changedOne[mixed] = True
+    changedTwo[mixed] = True
+
+    #create population from survivors, the interleaved rows are in the same order as the list version
+    newPopulation = Population(parents, EvaluateChanged(parents, fitness, changed), 0.0, 0.0)
+
+    return AddPopulationStats(newPopulation)
+
+
+def AddPopulationStats(population):
+    population.champion_fitness = float(population.fitness.max())
+    population.average_fitness = float(population.fitness.mean())
+
+    return population
+
+#Recomputes fitness only for the changed rows, counting every real evaluation
+#With no changed mask every row is evaluated
+def EvaluateChanged(representations, fitness, changed):
+    global cumulative_evals
+
+    if changed is None:
+        cumulative_evals += len(representations)
+        return DeJongFitness(representations)
+
+    fitness[changed] = DeJongFitness(representations[changed])
+    cumulative_evals += int(np.count_nonzero(changed))
+
+    return fitness
+
+def DeJongFitness(representations):
+
+    #Rosenbrock sum over each row of the matrix
+    x = representations[:, :-1]
+    xNext = representations[:, 1:]
+    dejong = 1 + np.sum(100 * ((xNext - (x ** 2)) ** 2) + ((x - 1) ** 2), axis=1)
+
+    return 1000 / dejong
+
+
+#Label that starts every line of this script's generation log
+def LogLabel():
+    return "DeJong Test Suite 2 GA {} {}".format(POPULATION_SIZE, 0.0)
+
+#One generation's statistics with a copy of its champion's row
+def GenerationStatistics(generation, population):
+    champion = population.representations[int(population.fitness.argmax())]
+
+    return GenerationStats(generation, cumulative_evals, population.champion_fitness, population.average_fitness, 0.0, tuple(champion.tolist()))
+
+#Runs the algorithm from a fresh population, yielding a GenerationStats for every generation
+#Nothing is written anywhere, and closing the generator stops the run
+def Evolve():
+    global cumulative_evals
+    cumulative_evals = 0
+
+    population = InitializePopulation()
+
+    yield GenerationStatistics(0, population)
+
+
+    for generation in range(1, NUMBER_OF_GENERATIONS):
+        #create new generation
+        population = MakeNewGeneration(population)
+
+        yield GenerationStatistics(generation, population)
+
+        if population.average_fitness > FITNESS_THRESHOLD:
+            print("THRESHOLD MET - Generation " + str(generation))
+            break
+
+    return population
+
+#Runs the algorithm, recording each generation to log
+def Run(log):
+    return RecordGenerations(log, Evolve())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--genes", type=int, default=N, help="number of genes N")
+    N = parser.parse_args().genes
+
+    print("N = {}, {} bytes per genome".format(N, BytesPerGenome()))
+
+    sequence = SeedScript(sys.modules[__name__], SEED)
+
+    with OpenLog(FILE_STRING, LogLabel(), BINARY_LOG, LOG_STRIDE, seed=SeedRecord(sequence)) as log:
+        Run(log)